@@ -0,0 +1,138 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+from question_formats import OutputFormat, get_format, open_output, output_extension, write_questions
+from simple_question_generator import ContentHashIds, SequentialIds, SimpleQuestionGenerator, TestQuestion
+
+DEFAULT_CHUNK_SIZE = 2000
+
+class AsyncQuestionGenerator:
+    
+    def __init__(self, state="SC", state_name: Optional[str] = None, seed: Optional[int] = None,
+                 executor: Optional[Executor] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 id_scheme: Optional[Union[SequentialIds, ContentHashIds]] = None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.generator = SimpleQuestionGenerator(state=state, state_name=state_name, seed=seed, id_scheme=id_scheme)
+        self.executor = executor
+        self.chunk_size = chunk_size
+    
+    @property
+    def state(self) -> str:
+        return self.generator.state
+    
+    @property
+    def seed(self) -> int:
+        return self.generator.seed
+    
+    async def _run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+    
+    async def agenerate_questions(self, num_questions: int = 50,
+                                  categories: List[str] = None,
+                                  complexity_override: Dict[str, float] = None,
+                                  engine: str = "python",
+                                  shard: int = 0,
+                                  num_shards: int = 1,
+                                  unique: bool = False,
+                                  stream: Optional[int] = None) -> List[TestQuestion]:
+        return await self._run(self.generator.generate_questions, num_questions, categories,
+                               complexity_override, engine, shard, num_shards, unique, stream)
+    
+    async def aiter_questions(self, num_questions: int = 50,
+                              categories: List[str] = None,
+                              complexity_override: Dict[str, float] = None,
+                              engine: str = "python",
+                              shard: int = 0,
+                              num_shards: int = 1,
+                              unique: bool = False,
+                              stream: Optional[int] = None) -> AsyncIterator[List[TestQuestion]]:
+        if engine == "numpy":
+            batch = await self._run(self.generator.generate_batch, num_questions, categories,
+                                    complexity_override, engine, shard, num_shards, unique, stream)
+            questions = iter(batch)
+        elif engine == "python":
+            questions = self.generator.iter_questions(num_questions, categories, complexity_override,
+                                                      shard, num_shards, unique, stream)
+        else:
+            raise ValueError(f"Unknown generation engine: {engine}")
+        
+        while True:
+            chunk = await self._run(_take, questions, self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    
+    async def agenerate_focused_test_set(self, focus_area: str, num_questions: int = 20,
+                                         engine: str = "python", shard: int = 0,
+                                         num_shards: int = 1, unique: bool = False) -> List[TestQuestion]:
+        return await self._run(self.generator.generate_focused_test_set, focus_area, num_questions,
+                               engine, shard, num_shards, unique)
+    
+    def aiter_focused_test_set(self, focus_area: str, num_questions: int = 20,
+                               engine: str = "python", shard: int = 0,
+                               num_shards: int = 1, unique: bool = False) -> AsyncIterator[List[TestQuestion]]:
+        categories, complexity_override = self.generator._get_focus_config(focus_area)
+        return self.aiter_questions(num_questions, categories, complexity_override, engine, shard, num_shards, unique)
+    
+    async def asave_questions(self, questions: Union[Iterable[TestQuestion], AsyncIterable[List[TestQuestion]]],
+                              filename: str = None, format: str = "json", compress: Optional[str] = None) -> str:
+        output_format = get_format(format)
+        
+        if filename is None:
+            timestamp = time.strftime('%Y%m%d_%H%M%S')
+            filename = f"simple_questions_{timestamp}{output_extension(format, compress)}"
+        
+        if output_format.columnar:
+            collected = [question async for chunk in self._achunks(questions) for question in chunk]
+            await self._run(write_questions, collected, filename, format, compress)
+            return filename
+        
+        output = open_output(filename, compress)
+        f = await self._run(output.__enter__)
+        try:
+            await self._run(f.write, output_format.header())
+            written = 0
+            async for chunk in self._achunks(questions):
+                if not chunk:
+                    continue
+                await self._run(_write_chunk, f, output_format, chunk, written == 0)
+                written += len(chunk)
+            await self._run(f.write, output_format.footer(written == 0))
+        except BaseException as exc:
+            await self._run(output.__exit__, type(exc), exc, exc.__traceback__)
+            raise
+        await self._run(output.__exit__, None, None, None)
+        
+        return filename
+    
+    async def _achunks(self, questions: Union[Iterable[TestQuestion], AsyncIterable[List[TestQuestion]]]
+                       ) -> AsyncIterator[List[TestQuestion]]:
+        if hasattr(questions, "__aiter__"):
+            async for chunk in questions:
+                yield chunk
+            return
+        
+        # A sync iterable may be a lazy generator, so it is consumed in the executor like aiter_questions.
+        questions = iter(questions)
+        while True:
+            chunk = await self._run(_take, questions, self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+async def agenerate_questions(num_questions: int = 50, state: str = "SC", state_name: Optional[str] = None,
+                              seed: Optional[int] = None, executor: Optional[Executor] = None,
+                              **options: Any) -> List[TestQuestion]:
+    generator = AsyncQuestionGenerator(state, state_name, seed, executor)
+    return await generator.agenerate_questions(num_questions, **options)
+
+def _take(questions: Iterator[TestQuestion], size: int) -> List[TestQuestion]:
+    return list(islice(questions, size))
+
+def _write_chunk(f, output_format: OutputFormat, chunk: List[TestQuestion], first: bool):
+    f.write(output_format.encode(chunk, first))
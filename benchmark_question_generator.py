@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+import simple_question_generator
+from simple_question_generator import SimpleQuestionGenerator, get_state_name, get_state_registry
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+FOCUS_AREAS = ("basic_services", "complex_scenarios")
+
+def _peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _best_of(repeat: int, func, warmup: bool = True) -> float:
+    if warmup:
+        func()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    benchmark = case["benchmark"]
+    state = case.get("state", "SC")
+    count = case.get("count", 1)
+    engine = case.get("engine", "python")
+    repeat = case.get("repeat", 1)
+    state_name = get_state_name(state)
+    
+    if benchmark == "construct_cold":
+        def func():
+            simple_question_generator._TEMPLATE_INDEXES.clear()
+            SimpleQuestionGenerator(state, state_name)
+        seconds = _best_of(repeat, func, warmup=False)
+    elif benchmark == "construct_warm":
+        SimpleQuestionGenerator(state, state_name)
+        seconds = _best_of(repeat, lambda: [SimpleQuestionGenerator(state, state_name) for _ in range(count)])
+    else:
+        generator = SimpleQuestionGenerator(state, state_name, seed=case.get("seed", 0))
+        if benchmark == "generate_questions":
+            seconds = _best_of(repeat, lambda: generator.generate_questions(count, engine=engine))
+        elif benchmark == "generate_batch":
+            seconds = _best_of(repeat, lambda: generator.generate_batch(count, engine=engine))
+        elif benchmark == "generate_focused_test_set":
+            seconds = _best_of(repeat, lambda: generator.generate_focused_test_set(case["focus_area"], count, engine=engine))
+        elif benchmark == "save_questions":
+            questions = generator.generate_questions(count)
+            with tempfile.TemporaryDirectory() as directory:
+                filename = os.path.join(directory, f"questions.{case['format']}")
+                seconds = _best_of(repeat, lambda: generator.save_questions(questions, filename, format=case["format"]))
+                case = {**case, "bytes": os.path.getsize(filename)}
+        else:
+            raise ValueError(f"Unknown benchmark: {benchmark}")
+    
+    return {
+        **case,
+        "seconds": seconds,
+        "questions_per_second": count / seconds if seconds else None,
+        "peak_rss_kb": _peak_rss_kb()
+    }
+
+def measure_startup(repeat: int = 5) -> Dict[str, Any]:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    commands = {
+        "interpreter": [sys.executable, "-c", "pass"],
+        "import": [sys.executable, "-c", "import generate_simple_questions"],
+        "cli": [sys.executable, os.path.join(directory, "generate_simple_questions.py"),
+                "--count", "1", "--output", os.devnull]
+    }
+    
+    timings = {}
+    for name, command in commands.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run(command, cwd=directory, check=True, stdout=subprocess.DEVNULL)
+            samples.append(time.perf_counter() - started)
+        timings[name] = sorted(samples)[len(samples) // 2]
+    
+    return {
+        "benchmark": "cli_startup",
+        "count": 1,
+        "repeat": repeat,
+        "seconds": timings["cli"],
+        "interpreter_seconds": timings["interpreter"],
+        "import_overhead_seconds": timings["import"] - timings["interpreter"],
+        "questions_per_second": None,
+        "peak_rss_kb": None
+    }
+
+def build_cases(states: List[str], scales: List[int], engines: List[str],
+                repeat: int, formats: List[str]) -> List[Dict[str, Any]]:
+    cases = []
+    for state in states:
+        cases.append({"benchmark": "construct_cold", "state": state, "count": 1, "repeat": repeat})
+        cases.append({"benchmark": "construct_warm", "state": state, "count": 1000, "repeat": repeat})
+        for engine in engines:
+            for count in scales:
+                cases.append({"benchmark": "generate_questions", "state": state, "engine": engine,
+                              "count": count, "repeat": repeat})
+                cases.append({"benchmark": "generate_batch", "state": state, "engine": engine,
+                              "count": count, "repeat": repeat})
+                for focus_area in FOCUS_AREAS:
+                    cases.append({"benchmark": "generate_focused_test_set", "state": state, "engine": engine,
+                                  "focus_area": focus_area, "count": count, "repeat": repeat})
+    for output_format in formats:
+        for count in scales:
+            cases.append({"benchmark": "save_questions", "state": states[0], "format": output_format,
+                          "count": count, "repeat": repeat})
+    return cases
+
+def run_benchmarks(cases: List[Dict[str, Any]], isolate: bool = True) -> List[Dict[str, Any]]:
+    if not isolate:
+        return [run_case(case) for case in cases]
+    
+    # A fresh process per case keeps peak RSS and the template cache per measurement.
+    results = []
+    context = get_context("spawn")
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(run_case, case).result())
+    return results
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _environment() -> Dict[str, Any]:
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy_version
+    }
+
+def _case_key(result: Dict[str, Any]) -> tuple:
+    return tuple(result.get(field) for field in ("benchmark", "state", "engine", "focus_area", "format", "count"))
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    baseline_results = {_case_key(result): result for result in baseline["results"]}
+    comparisons = []
+    for result in current["results"]:
+        previous = baseline_results.get(_case_key(result))
+        if previous is None or not previous["seconds"]:
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        comparisons.append({
+            "case": _case_key(result),
+            "baseline_seconds": previous["seconds"],
+            "seconds": result["seconds"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold
+        })
+    return comparisons
+
+def print_results(results: List[Dict[str, Any]], file=sys.stdout):
+    print(f"{'benchmark':<27} {'state':<5} {'engine':<7} {'variant':<17} {'count':>9} {'seconds':>10} {'q/s':>12} {'rss MB':>8}", file=file)
+    for result in results:
+        variant = result.get("focus_area") or result.get("format") or ""
+        rate = result["questions_per_second"]
+        rss = result["peak_rss_kb"]
+        print(f"{result['benchmark']:<27} {result.get('state', ''):<5} {result.get('engine', ''):<7} {variant:<17} "
+              f"{result['count']:>9} {result['seconds']:>10.4f} {rate if rate is not None else float('nan'):>12.0f} "
+              f"{rss / 1024 if rss is not None else float('nan'):>8.1f}", file=file)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark question generation throughput, latency and memory')
+    parser.add_argument('--states', default=','.join(get_state_registry()["states"]), help='Comma-separated state codes')
+    parser.add_argument('--scales', default='100,1000,10000,100000',
+                       help='Comma-separated question counts (e.g. 100,1000,...,10000000)')
+    parser.add_argument('--engines', default='python,numpy', help='Comma-separated engines to measure')
+    parser.add_argument('--formats', default='json,jsonl', help='Comma-separated save_questions formats')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per case (best time is kept)')
+    parser.add_argument('--no-isolate', action='store_true',
+                       help='Run every case in this process (faster, but peak RSS is cumulative)')
+    parser.add_argument('--import-budget-ms', type=float,
+                       help='Fail when importing the CLI adds more than this many milliseconds to interpreter start')
+    parser.add_argument('--output', help='Write machine-readable results to this JSON file')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                       help='Relative slowdown reported as a regression when comparing')
+    
+    args = parser.parse_args()
+    
+    engines = [engine for engine in args.engines.split(',') if engine]
+    if 'numpy' in engines:
+        try:
+            import numpy
+        except ImportError:
+            print("NumPy is not installed; skipping the numpy engine", file=sys.stderr)
+            engines.remove('numpy')
+    
+    cases = build_cases(
+        states=[state for state in args.states.split(',') if state],
+        scales=[int(float(scale)) for scale in args.scales.split(',') if scale],
+        engines=engines,
+        repeat=args.repeat,
+        formats=[output_format for output_format in args.formats.split(',') if output_format]
+    )
+    
+    startup = measure_startup(args.repeat)
+    report = {"environment": _environment(), "results": [startup] + run_benchmarks(cases, isolate=not args.no_isolate)}
+    print_results(report["results"])
+    print(f"CLI startup: {startup['seconds'] * 1000:.1f} ms "
+          f"(interpreter {startup['interpreter_seconds'] * 1000:.1f} ms, "
+          f"imports +{startup['import_overhead_seconds'] * 1000:.1f} ms)")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to: {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_results(baseline, report, args.threshold)
+        regressions = [comparison for comparison in comparisons if comparison["regression"]]
+        for comparison in comparisons:
+            marker = "REGRESSION" if comparison["regression"] else ""
+            print(f"{' '.join(str(part) for part in comparison['case'] if part is not None):<60} "
+                  f"{comparison['ratio']:>6.2f}x {marker}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    
+    if args.import_budget_ms is not None and startup["import_overhead_seconds"] * 1000 > args.import_budget_ms:
+        print(f"Import overhead exceeds the {args.import_budget_ms:.0f} ms budget")
+        return 1
+    
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
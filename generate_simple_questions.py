@@ -2,49 +2,362 @@
 
 import argparse
 import json
-from simple_question_generator import SimpleQuestionGenerator
-from datetime import datetime
+import os
+import sys
+import time
+from contextlib import nullcontext
+from itertools import chain
+from typing import Any, Dict, Optional, TextIO
+from question_formats import (
+    COMPRESSION_EXTENSIONS, FORMATS, append_questions, detect_format, get_format, output_extension,
+    read_question_index, write_questions
+)
+from question_cache import DEFAULT_MAX_BYTES, ResultCache, copy_result
+from simple_question_generator import ID_SCHEMES, QuestionBatch, SimpleQuestionGenerator, get_state_name, get_state_registry
 
 def main():
     parser = argparse.ArgumentParser(description='Generate simple test questions without expected links')
-    parser.add_argument('--count', type=int, default=25, help='Number of questions to generate')
+    parser.add_argument('--count', type=int,
+                       help='Number of questions to generate (default: 25, or the covering set size with --coverage)')
     parser.add_argument('--question-type', default='comprehensive', 
                        choices=['comprehensive', 'basic_services', 'complex_scenarios'],
                        help='Type of questions to generate')
     parser.add_argument('--state', default='SC', help='State code (e.g., SC, HI, IN, MS)')
-    parser.add_argument('--state-name', default='South Carolina', help='Full state name')
+    parser.add_argument('--state-name', help='Full state name (default: from the state registry)')
+    parser.add_argument('--states',
+                       help="Generate several states in one run: comma-separated codes, each optionally "
+                            "STATE=COUNT (default --count), or 'all' for every registered state")
+    parser.add_argument('--partition', action='store_true',
+                       help='With --states, write one file per state (--output must contain {state})')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible question sets')
+    parser.add_argument('--shard', type=int, default=0, help='Index of the shard to generate')
+    parser.add_argument('--num-shards', type=int, default=1, help='Number of shards the set is split into')
+    parser.add_argument('--unique', action='store_true', help='Never repeat a question within the set')
+    parser.add_argument('--category-weights', type=parse_weights, default={},
+                       help='Relative category mix, e.g. healthcare=3,recreation=0.5 (unlisted categories weigh 1)')
+    parser.add_argument('--persona-weights', type=parse_weights, default={},
+                       help='Relative persona mix, e.g. senior_citizen=2,college_student=0 (unlisted personas weigh 1)')
+    parser.add_argument('--persona-affinity', metavar='PATH', type=parse_affinity, default={},
+                       help='JSON persona x category x complexity affinity matrix scaling the persona mix per cell')
+    parser.add_argument('--coverage', action='store_true',
+                       help='Cover every reachable (category, subcategory, complexity, persona, template) cell once, '
+                            'then fill the rest of --count in proportion to the configured mix')
+    parser.add_argument('--coverage-report', metavar='PATH',
+                       help='Write a JSON cell coverage report for the generated questions to PATH')
+    parser.add_argument('--engine', default='python', choices=['python', 'numpy'],
+                       help='Sampling engine (numpy draws the whole set in vectorized batches)')
+    parser.add_argument('--format', choices=list(FORMATS),
+                       help='Output format (default: from the --output extension, else json; '
+                            'parquet and arrow are columnar and need pyarrow)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Write questions as they are generated (row formats only)')
+    parser.add_argument('--compress',
+                       help='gzip or zstd for row formats; a codec (e.g. zstd, snappy, lz4) for parquet and arrow')
+    parser.add_argument('--output', help="Output file path, or '-' for stdout")
+    parser.add_argument('--id-scheme', default='sequential', choices=list(ID_SCHEMES),
+                       help='Question IDs: zero-padded sequence, sequence prefixed with state and seed, or seeded content hash')
+    parser.add_argument('--id-prefix', help='ID prefix; may use {state} and {seed} (default: Q, or {state}-{seed}-Q when prefixed)')
+    parser.add_argument('--id-width', type=int, help='Digits in sequential IDs (default: enough for --count, at least 3)')
+    parser.add_argument('--append', action='store_true',
+                       help='Extend the existing --output file up to --count questions, continuing its IDs')
+    parser.add_argument('--cache', action='store_true',
+                       help='Serve repeated seeded runs from the on-disk result cache')
+    parser.add_argument('--cache-dir', help='Result cache directory (default: results/ under the template cache)')
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / 2 ** 20,
+                       help='Evict least recently used results beyond this size')
+    parser.add_argument('--profile', metavar='PATH',
+                       help='Write a cProfile dump to PATH and print per-stage timings to stderr')
     
     args = parser.parse_args()
+    if args.count is None and not args.coverage:
+        args.count = 25
     
-    generator = SimpleQuestionGenerator(state=args.state, state_name=args.state_name)
+    command = run_states if args.states else run
+    if not args.profile:
+        return command(args, parser)
     
-    if args.question_type == 'comprehensive':
-        questions = generator.generate_questions(args.count)
+    from question_profiling import StageProfiler, cprofile, format_stats
+    
+    profiler = StageProfiler()
+    with cprofile(args.profile) as profile:
+        status = command(args, parser, profiler)
+    print(profiler.format_table(), file=sys.stderr)
+    print(format_stats(profile), file=sys.stderr)
+    print(f"Profile saved to: {args.profile} (inspect with python -m pstats)", file=sys.stderr)
+    return status
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, (item.strip() for item in spec.split(','))):
+        name, _, weight = item.partition('=')
+        try:
+            weights[name.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected NAME=WEIGHT, got '{item}'") from None
+    return weights
+
+def parse_affinity(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            matrix = json.load(f)
+    except (OSError, ValueError) as exc:
+        raise argparse.ArgumentTypeError(f"cannot read affinity matrix {path}: {exc}") from None
+    if not isinstance(matrix, dict):
+        raise argparse.ArgumentTypeError(f"{path} must hold a JSON object keyed by persona")
+    return matrix
+
+def parse_state_quotas(spec: str, default_count: int) -> Dict[str, int]:
+    registered = get_state_registry()["states"]
+    if spec.strip().lower() == 'all':
+        return {state: default_count for state in registered}
+    
+    quotas = {}
+    for item in spec.split(','):
+        state, _, count = item.strip().partition('=')
+        state = state.strip().upper()
+        if not state:
+            continue
+        if state not in registered:
+            raise ValueError(f"Unknown state: {state} (registered: {', '.join(registered)})")
+        if state in quotas:
+            raise ValueError(f"State listed twice: {state}")
+        try:
+            quotas[state] = int(count) if count else default_count
+        except ValueError:
+            raise ValueError(f"Invalid question count for {state}: {count}") from None
+    if not quotas:
+        raise ValueError("--states lists no states")
+    return quotas
+
+def run_states(args: argparse.Namespace, parser: argparse.ArgumentParser, profiler=None) -> int:
+    try:
+        quotas = parse_state_quotas(args.states, args.count)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.state_name:
+        parser.error('--state-name cannot be combined with --states; names come from the state registry')
+    
+    if args.partition or len(quotas) == 1:
+        if args.partition and (args.output == '-' or (args.output and '{state}' not in args.output)):
+            parser.error('--partition needs an --output path containing {state}')
+        if args.partition and args.coverage_report and '{state}' not in args.coverage_report:
+            parser.error('--partition needs a --coverage-report path containing {state}')
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        for state, count in quotas.items():
+            output = args.output
+            if args.partition:
+                output = (args.output.replace('{state}', state) if args.output else
+                          f"simple_{args.question_type}_{state}_{timestamp}{output_extension(args.format or 'json', args.compress)}")
+            coverage_report = args.coverage_report and args.coverage_report.replace('{state}', state)
+            run(argparse.Namespace(**{**vars(args), 'states': None, 'state': state, 'count': count, 'output': output,
+                                      'coverage_report': coverage_report}),
+                parser, profiler)
+        return 0
+    
+    if args.append:
+        parser.error('--append with several --states needs --partition')
+    return run(args, parser, profiler, quotas)
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser, profiler=None,
+        quotas: Optional[Dict[str, int]] = None) -> int:
+    quotas = quotas or {args.state: args.count}
+    if args.output and args.output != '-':
+        # The extension decides compression even when --format is given, so e.csv.gz is never plain CSV.
+        detected_format, detected_compress = detect_format(args.output)
+        if args.compress and detected_compress and args.compress != detected_compress:
+            parser.error(f"--compress {args.compress} does not match the {detected_compress} extension of {args.output}")
+        args.format = args.format or detected_format
+        args.compress = args.compress or detected_compress
+    elif args.format is None:
+        args.format = 'json'
+    
+    output_format = get_format(args.format)
+    codecs = output_format.codecs if output_format.columnar else tuple(COMPRESSION_EXTENSIONS)
+    if args.stream and output_format.columnar:
+        parser.error(f'--stream is not supported by --format {args.format}')
+    if args.compress and args.compress not in codecs:
+        parser.error(f"--format {args.format} supports --compress {', '.join(codecs)}")
+    if args.stream and args.engine != 'python':
+        parser.error('--stream is only supported by the python engine')
+    if args.unique and args.engine != 'python':
+        parser.error('--unique is only supported by the python engine')
+    if args.append and (not args.output or args.output == '-'):
+        parser.error('--append requires --output PATH')
+    if args.append and (output_format.columnar or args.num_shards != 1 or args.engine != 'python'):
+        parser.error('--append only supports unsharded row formats with the python engine')
+    if args.cache and args.seed is None:
+        parser.error('--cache requires --seed')
+    if args.cache and args.append:
+        parser.error('--cache cannot be combined with --append')
+    if args.coverage and (args.append or args.unique or args.num_shards != 1 or args.engine != 'python'):
+        parser.error('--coverage only supports unsharded, non-unique runs with the python engine')
+    if args.coverage_report and args.cache:
+        parser.error('--coverage-report cannot be combined with --cache')
+    
+    id_prefix = args.id_prefix
+    if id_prefix is None and args.id_scheme == 'sequential' and len(quotas) > 1:
+        # A combined corpus would otherwise repeat Q001.. once per state.
+        id_prefix = '{state}-Q'
+    id_scheme = ID_SCHEMES[args.id_scheme](id_prefix, args.id_width)
+    shard_options = {'shard': args.shard, 'num_shards': args.num_shards, 'unique': args.unique}
+    
+    index = None
+    if args.append and os.path.exists(args.output):
+        try:
+            index = read_question_index(args.output, args.format, args.compress)
+        except (ValueError, KeyError) as exc:
+            parser.error(f"Cannot index {args.output}: {exc}")
+        if index.states - {args.state}:
+            parser.error(f"{args.output} holds questions for {', '.join(sorted(index.states))}, not {args.state}")
+        if not index.ids_contiguous:
+            parser.error(f"{args.output} does not have contiguous sequential IDs")
+        if index.count:
+            # Appended IDs continue the file's own prefix and padding.
+            try:
+                id_scheme = index.id_scheme(args.count)
+            except ValueError as exc:
+                parser.error(f"Cannot append to {args.output}: {exc}")
+    
+    filename = args.output
+    if filename is None:
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        filename = f"simple_{args.question_type}_{timestamp}{output_extension(args.format, args.compress)}"
+    destination = sys.stdout.buffer if filename == '-' else filename
+    
+    cache = ResultCache(args.cache_dir, int(args.cache_max_mb * 2 ** 20)) if args.cache else None
+    if cache is not None and cache.enabled:
+        # Keyed on the serialized output, so a hit is a file copy with no generation or encoding.
+        cache_key = cache.key({
+            "states": [[state, args.state_name or get_state_name(state), count] for state, count in quotas.items()],
+            "seed": args.seed,
+            "question_type": args.question_type,
+            "category_weights": args.category_weights,
+            "persona_weights": args.persona_weights,
+            "persona_affinity": args.persona_affinity,
+            "coverage": args.coverage,
+            **shard_options,
+            "id_scheme": [type(id_scheme).__name__, vars(id_scheme)],
+            "format": args.format,
+            "compress": args.compress
+        }, quotas)
+        cache_suffix = output_extension(args.format, args.compress)
+        cached = cache.lookup(cache_key, cache_suffix)
+        if cached is not None:
+            copy_result(cached, destination)
+            print(f"Served cached simple questions to: {'stdout' if filename == '-' else filename}",
+                  file=sys.stderr if filename == '-' else sys.stdout)
+            return 0
     else:
-        questions = generator.generate_focused_test_set(args.question_type, args.count)
+        cache = None
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"simple_{args.question_type}_{timestamp}.json"
+    coverage_maps = [] if args.coverage_report else None
+    try:
+        parts = []
+        for state, count in quotas.items():
+            generator = SimpleQuestionGenerator(state=state, state_name=args.state_name, seed=args.seed,
+                                                id_scheme=id_scheme, profiler=profiler,
+                                                category_weights=args.category_weights,
+                                                persona_weights=args.persona_weights,
+                                                persona_affinity=args.persona_affinity)
+            questions = _generate_state(args, generator, count, shard_options, index)
+            if coverage_maps is not None:
+                questions = _track_coverage(args, generator, questions, coverage_maps)
+            parts.append(questions)
+    except ValueError as exc:
+        parser.error(str(exc))
+    # Several states are written as one stream, in the order they were listed.
+    questions = parts[0] if len(parts) == 1 else chain.from_iterable(parts)
     
-    questions_data = []
-    for q in questions:
-        questions_data.append({
-            'id': q.id,
-            'question': q.question,
-            'category': q.category,
-            'subcategory': q.subcategory,
-            'complexity': q.complexity,
-            'priority': q.priority,
-            'user_persona': q.user_persona,
-            'state': q.state
-        })
+    if index is not None:
+        try:
+            with profiler.stage('append') if profiler is not None else nullcontext():
+                written = append_questions(questions, filename, args.format, args.compress, index)
+        except ValueError as exc:
+            parser.error(str(exc))
+        if profiler is not None:
+            profiler.count('append', written)
+        print(f"Appended {written} simple questions to: {filename} ({index.count + written} total)")
+        if coverage_maps is not None:
+            _write_coverage_report(args.coverage_report, coverage_maps, sys.stdout)
+        return 0
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(questions_data, f, indent=2, ensure_ascii=False)
+    # Streamed questions are generated while they are written, so that stage covers both.
+    write_stage = 'stream' if args.stream else 'write'
+    try:
+        with profiler.stage(write_stage) if profiler is not None else nullcontext():
+            if cache is not None and filename != '-':
+                # The output is written first, so a cache that cannot be written never costs the result.
+                written = write_questions(questions, destination, args.format, args.compress)
+                try:
+                    cache.store(cache_key, cache_suffix, lambda path: copy_result(filename, path))
+                except OSError as exc:
+                    print(f"Warning: could not cache the result: {exc}", file=sys.stderr)
+            elif cache is not None:
+                counts = []
+                try:
+                    cached = cache.store(cache_key, cache_suffix,
+                                         lambda path: counts.append(write_questions(questions, path, args.format, args.compress)))
+                except OSError as exc:
+                    parser.error(f"Cannot write the result cache: {exc} (rerun without --cache)")
+                copy_result(cached, destination)
+                written = counts[0]
+            else:
+                written = write_questions(questions, destination, args.format, args.compress)
+    except ImportError as exc:
+        parser.error(str(exc))
+    if profiler is not None:
+        profiler.count(write_stage, written)
     
-    print(f"Generated {len(questions)} simple questions saved to: {filename}")
+    if filename == '-':
+        print(f"Generated {written} simple questions", file=sys.stderr)
+    else:
+        print(f"Generated {written} simple questions saved to: {filename}")
+    if coverage_maps is not None:
+        _write_coverage_report(args.coverage_report, coverage_maps, sys.stderr if filename == '-' else sys.stdout)
     
     return 0
 
+def _generate_state(args: argparse.Namespace, generator: SimpleQuestionGenerator, count: Optional[int],
+                    shard_options: Dict[str, int], index):
+    if args.coverage:
+        if args.question_type == 'comprehensive':
+            return generator.iter_covering_set(count)
+        return generator.iter_focused_covering_set(args.question_type, count)
+    if index is not None:
+        if args.question_type == 'comprehensive':
+            return generator.iter_question_delta(count, index.cell_counts, unique=args.unique,
+                                                 existing_questions=index.questions)
+        return generator.iter_focused_delta(args.question_type, count, index.cell_counts,
+                                            unique=args.unique, existing_questions=index.questions)
+    if args.stream:
+        if args.question_type == 'comprehensive':
+            return generator.iter_questions(count, **shard_options)
+        return generator.iter_focused_test_set(args.question_type, count, **shard_options)
+    if args.question_type == 'comprehensive':
+        return generator.generate_batch(count, engine=args.engine, **shard_options)
+    return generator.generate_focused_batch(args.question_type, count, engine=args.engine, **shard_options)
+
+def _track_coverage(args: argparse.Namespace, generator: SimpleQuestionGenerator, questions, coverage_maps):
+    from question_coverage import CoverageMap, CoverageSpace
+    
+    if args.question_type == 'comprehensive':
+        space = CoverageSpace(generator)
+    else:
+        space = CoverageSpace.for_focus(generator, args.question_type)
+    coverage = CoverageMap(space)
+    coverage_maps.append(coverage)
+    if isinstance(questions, QuestionBatch):
+        coverage.update(questions)
+        return questions
+    # Iterators are marked as they are written, so streamed runs stay single-pass.
+    return coverage.track(questions)
+
+def _write_coverage_report(path: str, coverage_maps, summary_file: TextIO):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({coverage.space.state: coverage.report() for coverage in coverage_maps}, f, indent=2)
+    for coverage in coverage_maps:
+        print(coverage.format_report(), file=summary_file)
+    print(f"Coverage report saved to: {path}", file=summary_file)
+
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    exit(main())
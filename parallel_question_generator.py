@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from simple_question_generator import (
+    ID_SCHEMES, STATE_NAMES, SequentialIds, SimpleQuestionGenerator, TestQuestion, get_state_registry,
+    question_to_dict, write_questions_jsonl
+)
+
+@dataclass
+class ShardTask:
+    state: str
+    state_name: str
+    seed: int
+    question_type: str
+    num_questions: int
+    shard: int
+    num_shards: int
+    engine: str = "python"
+    serialize: bool = False
+    id_scheme: Any = None
+
+@dataclass
+class ShardResult:
+    state: str
+    shard: int
+    count: int
+    seconds: float
+    worker_pid: int
+    questions: Optional[List[TestQuestion]] = None
+    jsonl: Optional[str] = None
+    
+    @property
+    def questions_per_second(self) -> float:
+        return self.count / self.seconds if self.seconds else float("inf")
+
+def _generate_shard(task: ShardTask) -> ShardResult:
+    started = time.perf_counter()
+    # Every shard binds the same scheme to the same set size, so IDs agree without coordination.
+    generator = SimpleQuestionGenerator(state=task.state, state_name=task.state_name, seed=task.seed,
+                                        id_scheme=task.id_scheme or SequentialIds("{state}-Q"))
+    
+    if task.question_type == "comprehensive":
+        questions = generator.generate_questions(
+            task.num_questions, engine=task.engine, shard=task.shard, num_shards=task.num_shards
+        )
+    else:
+        questions = generator.generate_focused_test_set(
+            task.question_type, task.num_questions, engine=task.engine,
+            shard=task.shard, num_shards=task.num_shards
+        )
+    
+    count = len(questions)
+    jsonl = None
+    if task.serialize:
+        buffer = io.StringIO()
+        write_questions_jsonl(questions, buffer)
+        jsonl = buffer.getvalue()
+        questions = None
+    
+    return ShardResult(
+        state=task.state,
+        shard=task.shard,
+        count=count,
+        seconds=time.perf_counter() - started,
+        worker_pid=os.getpid(),
+        questions=questions,
+        jsonl=jsonl
+    )
+
+def iter_parallel_shards(states: Sequence[str], num_questions: int,
+                         question_type: str = "comprehensive",
+                         seed: Optional[int] = None,
+                         num_shards: Optional[int] = None,
+                         workers: Optional[int] = None,
+                         engine: str = "python",
+                         state_names: Optional[Dict[str, str]] = None,
+                         serialize: bool = False,
+                         id_scheme: Any = None) -> Iterator[ShardResult]:
+    check_states(states)
+    if seed is None:
+        seed = random.getrandbits(64)
+    workers = workers or os.cpu_count() or 1
+    if num_shards is None:
+        num_shards = max(1, -(-workers // len(states)))
+    state_names = {**STATE_NAMES, **(state_names or {})}
+    
+    tasks = [
+        ShardTask(
+            state=state,
+            state_name=state_names.get(state, state),
+            seed=seed,
+            question_type=question_type,
+            num_questions=num_questions,
+            shard=shard,
+            num_shards=num_shards,
+            engine=engine,
+            serialize=serialize,
+            id_scheme=id_scheme
+        )
+        for state in states
+        for shard in range(num_shards)
+    ]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        yield from executor.map(_generate_shard, tasks)
+
+def check_states(states: Sequence[str]):
+    # Unregistered codes would otherwise fall back to the default pack under the wrong label.
+    if not states:
+        raise ValueError("At least one state is required")
+    registered = get_state_registry()["states"]
+    unknown = [state for state in states if state not in registered]
+    if unknown:
+        raise ValueError(f"Unknown state(s): {', '.join(unknown)} (registered: {', '.join(registered)})")
+
+def generate_parallel(states: Sequence[str], num_questions: int,
+                      question_type: str = "comprehensive",
+                      seed: Optional[int] = None,
+                      num_shards: Optional[int] = None,
+                      workers: Optional[int] = None,
+                      engine: str = "python",
+                      state_names: Optional[Dict[str, str]] = None,
+                      id_scheme: Any = None) -> Tuple[List[TestQuestion], List[ShardResult]]:
+    questions = []
+    results = []
+    for result in iter_parallel_shards(states, num_questions, question_type, seed,
+                                       num_shards, workers, engine, state_names, id_scheme=id_scheme):
+        questions.extend(result.questions)
+        results.append(result)
+    return questions, results
+
+def print_worker_report(results: List[ShardResult], wall_seconds: float, file=sys.stdout):
+    print(f"{'state':<6} {'shard':>5} {'pid':>8} {'questions':>10} {'seconds':>9} {'q/s':>12}", file=file)
+    for result in results:
+        print(f"{result.state:<6} {result.shard:>5} {result.worker_pid:>8} {result.count:>10} "
+              f"{result.seconds:>9.3f} {result.questions_per_second:>12.0f}", file=file)
+    total = sum(result.count for result in results)
+    rate = total / wall_seconds if wall_seconds else float("inf")
+    print(f"Total: {total} questions in {wall_seconds:.3f}s ({rate:.0f} q/s wall clock)", file=file)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate question sets for several states in parallel')
+    parser.add_argument('--states', default='SC,HI,IN,MS', help='Comma-separated state codes')
+    parser.add_argument('--count', type=int, default=25, help='Number of questions to generate per state')
+    parser.add_argument('--question-type', default='comprehensive',
+                       choices=['comprehensive', 'basic_services', 'complex_scenarios'],
+                       help='Type of questions to generate')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible question sets')
+    parser.add_argument('--shards', type=int, help='Shards per state (default: spread the workers over the states)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--engine', default='python', choices=['python', 'numpy'], help='Sampling engine')
+    parser.add_argument('--format', default='jsonl', choices=['json', 'jsonl'], help='Output format')
+    parser.add_argument('--id-scheme', default='sequential', choices=list(ID_SCHEMES), help='Question ID scheme')
+    parser.add_argument('--id-prefix', help='ID prefix; may use {state} and {seed} (default: {state}-Q for sequential IDs)')
+    parser.add_argument('--output', help='Output file path')
+    
+    args = parser.parse_args()
+    states = [state.strip().upper() for state in args.states.split(',') if state.strip()]
+    try:
+        check_states(states)
+    except ValueError as exc:
+        parser.error(str(exc))
+    
+    filename = args.output
+    if filename is None:
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        filename = f"simple_{args.question_type}_{'_'.join(states)}_{timestamp}.{args.format}"
+    
+    id_prefix = args.id_prefix or ('{state}-Q' if args.id_scheme == 'sequential' else None)
+    
+    started = time.perf_counter()
+    results = []
+    shards = iter_parallel_shards(states, args.count, args.question_type, args.seed,
+                                  args.shards, args.workers, args.engine,
+                                  serialize=args.format == 'jsonl',
+                                  id_scheme=ID_SCHEMES[args.id_scheme](id_prefix))
+    
+    if args.format == 'jsonl':
+        with open(filename, 'w', encoding='utf-8') as f:
+            for result in shards:
+                f.write(result.jsonl)
+                results.append(result)
+    else:
+        questions_data = []
+        for result in shards:
+            questions_data.extend(question_to_dict(q) for q in result.questions)
+            results.append(result)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(questions_data, f, indent=2, ensure_ascii=False)
+    
+    print_worker_report(results, time.perf_counter() - started)
+    print(f"Saved to: {filename}")
+    
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
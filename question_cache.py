@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Optional, Union
+
+from simple_question_generator import QuestionBatch, _template_cache_dir, _template_pack_path
+
+RESULT_CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Cached results are only valid for the code that sampled and encoded them, so these
+# modules' sources are part of every key.
+OUTPUT_SOURCES = ("simple_question_generator.py", "question_coverage.py", "question_formats.py", "generate_simple_questions.py")
+
+_BATCH_SUFFIX = ".batch.pickle"
+
+class ResultCache:
+    
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        if directory is None:
+            base = _template_cache_dir()
+            directory = os.path.join(base, "results") if base else None
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+    
+    def key(self, params: Dict[str, Any], states: Optional[Iterable[str]] = None) -> str:
+        payload = {
+            **params,
+            "cache_version": RESULT_CACHE_VERSION,
+            "code": output_code_digest(),
+            "template_packs": [template_pack_digest(state) for state in states or [params["state"]]]
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return _sha256(encoded.encode("utf-8")).hexdigest()
+    
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+    
+    def lookup(self, key: str, suffix: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self.path(key, suffix)
+        try:
+            # The modification time doubles as the LRU recency stamp.
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+    
+    def store(self, key: str, suffix: str, write: Callable[[str], Any]) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self.path(key, suffix)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        # The new entry is kept even when it alone exceeds max_bytes; the next store evicts it.
+        self.evict(keep=path)
+        return path
+    
+    def load_batch(self, key: str) -> Optional[Dict[str, Any]]:
+        import pickle
+        
+        path = self.lookup(key, _BATCH_SUFFIX)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+    
+    def store_batch(self, key: str, batch: QuestionBatch) -> Optional[str]:
+        import pickle
+        
+        # The bound ID formatter is rebuilt from the generator on load, so only the columns are kept.
+        columns = {name: getattr(batch, name) for name in QuestionBatch.__slots__ if name != "id_format"}
+        
+        def write(path: str):
+            with open(path, 'wb') as f:
+                pickle.dump(columns, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self.store(key, _BATCH_SUFFIX, write)
+    
+    def evict(self, keep: Optional[str] = None):
+        entries = []
+        total = 0
+        try:
+            scanned = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in scanned:
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+    
+    def clear(self):
+        if not self.enabled or not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+@lru_cache(maxsize=None)
+def output_code_digest() -> str:
+    digest = _sha256()
+    for name in OUTPUT_SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def template_pack_digest(state: str) -> str:
+    with open(_template_pack_path(state), 'rb') as f:
+        return _sha256(f.read()).hexdigest()
+
+def copy_result(path: str, file: Union[str, BinaryIO]):
+    import mmap
+    import shutil
+    
+    if isinstance(file, str):
+        shutil.copyfile(path, file)
+        return
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            file.write(mapped)
+
+def _sha256(data: bytes = b""):
+    # hashlib is only imported once a cache is actually keyed.
+    from hashlib import sha256
+    return sha256(data)
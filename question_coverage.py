@@ -0,0 +1,194 @@
+import re
+from string import Formatter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from simple_question_generator import SimpleQuestionGenerator, SlotTemplate, TemplateIndex, TemplateSlice, TestQuestion
+
+DIMENSIONS = ("category", "subcategory", "complexity", "persona", "template")
+FALLBACK_TEMPLATE = -1
+
+CoverageCell = Tuple[str, str, str, str, int]
+
+class CoverageSpace:
+    
+    def __init__(self, generator: SimpleQuestionGenerator, categories: Optional[List[str]] = None,
+                 complexity_override: Optional[Dict[str, Any]] = None):
+        if categories is None:
+            categories = list(generator.categories.keys())
+        index = generator._index
+        self.state = generator.state
+        self.templates = index.templates
+        self.cells: List[CoverageCell] = []
+        # (category, complexity, persona) -> first cell, subcategory positions, template positions
+        self._blocks: Dict[Tuple[str, str, str], Tuple[int, Dict[str, int], Dict[int, int]]] = {}
+        self._matchers: Dict[Tuple[str, str], _TemplateMatcher] = {}
+        
+        # Only cells that sampling can reach count: zero weights and affinities are left out.
+        for category in categories:
+            if not generator.category_weights.get(category, 1.0):
+                continue
+            info = generator.categories[category]
+            subcategories = [info["subcategories"][i] for i in index.subcategory_aliases[category].support()]
+            complexity_dist = complexity_override.get(category, info["complexity_distribution"]) if complexity_override else info["complexity_distribution"]
+            for complexity, complexity_weight in complexity_dist.items():
+                if not complexity_weight:
+                    continue
+                template_slice = index.template_slices.get(category, {}).get(complexity)
+                if template_slice:
+                    templates = template_slice.alias.support()
+                    self._matchers[(category, complexity)] = _TemplateMatcher(index, template_slice)
+                else:
+                    templates = (FALLBACK_TEMPLATE,)
+                affinity = generator.persona_affinity.weights(category, complexity) if generator.persona_affinity else None
+                for position, persona in enumerate(generator.user_personas):
+                    weight = generator.persona_weights.get(persona, 1.0) * (affinity[position] if affinity else 1.0)
+                    if not weight:
+                        continue
+                    self._blocks[(category, complexity, persona)] = (
+                        len(self.cells),
+                        {subcategory: i for i, subcategory in enumerate(subcategories)},
+                        {template: i for i, template in enumerate(templates)}
+                    )
+                    self.cells.extend((category, subcategory, complexity, persona, template)
+                                      for subcategory in subcategories for template in templates)
+    
+    @classmethod
+    def for_focus(cls, generator: SimpleQuestionGenerator, focus_area: str) -> "CoverageSpace":
+        categories, complexity_override = generator._get_focus_config(focus_area)
+        return cls(generator, categories, complexity_override)
+    
+    def __len__(self) -> int:
+        return len(self.cells)
+    
+    def cell_index(self, question: TestQuestion) -> Optional[int]:
+        if question.state != self.state:
+            return None
+        block = self._blocks.get((question.category, question.complexity, question.user_persona))
+        if block is None:
+            return None
+        start, subcategories, templates = block
+        subcategory = subcategories.get(question.subcategory)
+        if subcategory is None:
+            return None
+        matcher = self._matchers.get((question.category, question.complexity))
+        template = templates.get(matcher.template(question.question) if matcher else FALLBACK_TEMPLATE)
+        if template is None:
+            return None
+        return start + subcategory * len(templates) + template
+    
+    def template_label(self, category: str, complexity: str, template: int) -> str:
+        if template == FALLBACK_TEMPLATE:
+            return "(fallback)"
+        return self.templates[category][complexity][template]
+
+class CoverageMap:
+    
+    def __init__(self, space: CoverageSpace):
+        self.space = space
+        self.bitmap = bytearray((len(space) + 7) // 8)
+        self.covered = 0
+        self.questions = 0
+        self.outside = 0
+    
+    def __contains__(self, cell: int) -> bool:
+        return bool(self.bitmap[cell >> 3] & (1 << (cell & 7)))
+    
+    def mark(self, question: TestQuestion) -> Optional[bool]:
+        cell = self.space.cell_index(question)
+        if cell is None:
+            self.outside += 1
+            return None
+        self.questions += 1
+        mask = 1 << (cell & 7)
+        if self.bitmap[cell >> 3] & mask:
+            return False
+        self.bitmap[cell >> 3] |= mask
+        self.covered += 1
+        return True
+    
+    def update(self, questions: Iterable[TestQuestion]) -> "CoverageMap":
+        for question in questions:
+            self.mark(question)
+        return self
+    
+    def track(self, questions: Iterable[TestQuestion]) -> Iterator[TestQuestion]:
+        for question in questions:
+            self.mark(question)
+            yield question
+    
+    @property
+    def coverage(self) -> float:
+        return self.covered / len(self.space) if self.space else 1.0
+    
+    def missing(self) -> Iterator[CoverageCell]:
+        for cell, values in enumerate(self.space.cells):
+            if cell not in self:
+                yield values
+    
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        dimensions = {name: {} for name in DIMENSIONS}
+        missing = []
+        for cell, (category, subcategory, complexity, persona, template) in enumerate(self.space.cells):
+            hit = cell in self
+            labels = (category, subcategory, complexity, persona, self.space.template_label(category, complexity, template))
+            for name, label in zip(DIMENSIONS, labels):
+                counts = dimensions[name].setdefault(label, {"covered": 0, "cells": 0})
+                counts["cells"] += 1
+                counts["covered"] += hit
+            if not hit and len(missing) < limit:
+                missing.append(dict(zip(DIMENSIONS, labels)))
+        
+        return {
+            "state": self.space.state,
+            "cells": len(self.space),
+            "covered": self.covered,
+            "coverage": self.coverage,
+            "questions": self.questions,
+            "outside": self.outside,
+            "dimensions": dimensions,
+            "missing": missing
+        }
+    
+    def format_report(self, limit: int = 10) -> str:
+        report = self.report(limit)
+        lines = [f"{report['state']} coverage: {report['covered']}/{report['cells']} cells "
+                 f"({report['coverage']:.1%}) from {report['questions']} questions"]
+        if report["outside"]:
+            lines.append(f"{report['outside']} questions fall outside the coverage space")
+        for name, values in report["dimensions"].items():
+            complete = sum(counts["covered"] == counts["cells"] for counts in values.values())
+            lines.append(f"  {name:<12} {complete:>5}/{len(values):<5} values fully covered")
+        for cell in report["missing"]:
+            lines.append("  missing: " + " / ".join(cell.values()))
+        return "\n".join(lines)
+
+class _TemplateMatcher:
+    
+    def __init__(self, index: TemplateIndex, template_slice: TemplateSlice):
+        # Rendered texts map straight to their template; slot templates are matched by pattern.
+        self.texts: Dict[str, int] = {}
+        self.patterns: List[Tuple[re.Pattern, int]] = []
+        for template, (start, count) in enumerate(zip(template_slice.starts, template_slice.counts)):
+            for pool_index in range(start, start + count):
+                slot_template = index.slot_templates.get(pool_index)
+                if slot_template is None:
+                    self.texts.setdefault(index.question_pool[pool_index], template)
+                else:
+                    self.patterns.append((_slot_pattern(slot_template), template))
+    
+    def template(self, question: str) -> Optional[int]:
+        template = self.texts.get(question)
+        if template is None:
+            for pattern, candidate in self.patterns:
+                if pattern.fullmatch(question):
+                    return candidate
+        return template
+
+def _slot_pattern(template: SlotTemplate) -> re.Pattern:
+    values = iter(template.values)
+    pattern = []
+    for literal, field, _, _ in Formatter().parse(template.text):
+        pattern.append(re.escape(literal))
+        if field is not None:
+            pattern.append("(?:" + "|".join(re.escape(value) for value in next(values)) + ")")
+    return re.compile("".join(pattern))
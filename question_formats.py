@@ -0,0 +1,371 @@
+import csv
+import io
+import json
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from simple_question_generator import PRIORITY_BY_COMPLEXITY, QuestionBatch, SequentialIds, TestQuestion, question_to_dict
+
+CHUNK_SIZE = 4096
+QUESTION_FIELDS = ("id", "question", "category", "subcategory", "complexity", "priority", "user_persona", "state")
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+_SEQUENTIAL_ID = re.compile(r"(.*?)(\d+)")
+
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+class OutputFormat:
+    columnar = False
+    
+    def __init__(self, name: str, extension: str):
+        self.name = name
+        self.extension = extension
+    
+    def header(self) -> bytes:
+        return b""
+    
+    def encode(self, questions: List[TestQuestion], first: bool) -> bytes:
+        raise NotImplementedError
+    
+    def footer(self, empty: bool) -> bytes:
+        return b""
+    
+    def write(self, questions: Iterable[TestQuestion], f: BinaryIO) -> int:
+        f.write(self.header())
+        written = self._write_body(questions, f, first=True)
+        f.write(self.footer(written == 0))
+        return written
+    
+    def append(self, questions: Iterable[TestQuestion], path: str, compress: Optional[str], empty: bool) -> int:
+        # Compressed streams are appended as a new gzip member / zstd frame.
+        with open(path, 'ab') as raw:
+            at_start = raw.tell() == 0
+            with open_output(raw, compress) as f:
+                if at_start:
+                    f.write(self.header())
+                return self._write_body(questions, f, first=empty)
+    
+    def read_records(self, f: BinaryIO) -> Iterator[Dict[str, str]]:
+        raise NotImplementedError
+    
+    def _write_body(self, questions: Iterable[TestQuestion], f: BinaryIO, first: bool) -> int:
+        written = 0
+        iterator = iter(questions)
+        while True:
+            chunk = list(islice(iterator, CHUNK_SIZE))
+            if not chunk:
+                break
+            f.write(self.encode(chunk, first and written == 0))
+            written += len(chunk)
+        return written
+
+class JsonFormat(OutputFormat):
+    
+    def header(self) -> bytes:
+        return b"["
+    
+    def encode(self, questions: List[TestQuestion], first: bool) -> bytes:
+        # Each chunk is dumped as an indented list and spliced without its brackets,
+        # which reproduces json.dump(..., indent=2) of the whole set.
+        orjson = _import_orjson()
+        if orjson is not None:
+            body = orjson.dumps(questions, option=orjson.OPT_INDENT_2)
+        else:
+            body = json.dumps([question_to_dict(q) for q in questions], indent=2, ensure_ascii=False).encode("utf-8")
+        return (b"\n" if first else b",\n") + body[2:-2]
+    
+    def footer(self, empty: bool) -> bytes:
+        return b"]" if empty else b"\n]"
+    
+    def append(self, questions: Iterable[TestQuestion], path: str, compress: Optional[str], empty: bool) -> int:
+        if compress is not None:
+            raise ValueError(f"Appending to compressed {self.name} output is not supported; use jsonl")
+        
+        # Only the closing bracket (and whitespace before it) is rewritten.
+        with open(path, 'r+b') as f:
+            start = max(0, f.seek(0, io.SEEK_END) - 4096)
+            f.seek(start)
+            tail = f.read().rstrip()
+            if not tail.endswith(b"]"):
+                raise ValueError(f"{path} does not end with a JSON list")
+            f.seek(start + len(tail[:-1].rstrip()))
+            f.truncate()
+            written = self._write_body(questions, f, first=empty)
+            f.write(self.footer(empty and not written))
+        return written
+    
+    def read_records(self, f: BinaryIO) -> Iterator[Dict[str, str]]:
+        return iter(json.load(f))
+
+class CompactJsonFormat(JsonFormat):
+    
+    def encode(self, questions: List[TestQuestion], first: bool) -> bytes:
+        body = b",".join(dumps_question(q) for q in questions)
+        return body if first else b"," + body
+    
+    def footer(self, empty: bool) -> bytes:
+        return b"]"
+
+class JsonLinesFormat(OutputFormat):
+    
+    def encode(self, questions: List[TestQuestion], first: bool) -> bytes:
+        return encode_questions_jsonl(questions)
+    
+    def read_records(self, f: BinaryIO) -> Iterator[Dict[str, str]]:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class CsvFormat(OutputFormat):
+    
+    def header(self) -> bytes:
+        return self._encode_rows([QUESTION_FIELDS])
+    
+    def encode(self, questions: List[TestQuestion], first: bool) -> bytes:
+        return self._encode_rows(
+            (q.id, q.question, q.category, q.subcategory, q.complexity, q.priority, q.user_persona, q.state)
+            for q in questions
+        )
+    
+    def read_records(self, f: BinaryIO) -> Iterator[Dict[str, str]]:
+        return csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+    
+    @staticmethod
+    def _encode_rows(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+class ColumnarFormat(OutputFormat):
+    columnar = True
+    codecs: Tuple[str, ...] = ()
+    
+    def append(self, questions: Iterable[TestQuestion], path: str, compress: Optional[str], empty: bool) -> int:
+        raise ValueError(f"Appending is not supported for {self.name} output")
+    
+    def write_batch(self, batch: QuestionBatch, file: Union[str, BinaryIO], compress: Optional[str]) -> int:
+        raise NotImplementedError
+
+class ArrowFormat(ColumnarFormat):
+    codecs = ("zstd", "lz4")
+    
+    def write_batch(self, batch: QuestionBatch, file: Union[str, BinaryIO], compress: Optional[str]) -> int:
+        table = questions_to_arrow(batch)
+        from pyarrow import feather
+        feather.write_feather(table, file, compression=compress or "uncompressed")
+        return len(batch)
+
+class ParquetFormat(ColumnarFormat):
+    codecs = ("snappy", "gzip", "zstd", "brotli", "lz4")
+    
+    def write_batch(self, batch: QuestionBatch, file: Union[str, BinaryIO], compress: Optional[str]) -> int:
+        table = questions_to_arrow(batch)
+        from pyarrow import parquet
+        parquet.write_table(table, file, compression=compress or "snappy")
+        return len(batch)
+
+FORMATS: Dict[str, OutputFormat] = {}
+
+def register_format(output_format: OutputFormat) -> OutputFormat:
+    FORMATS[output_format.name] = output_format
+    return output_format
+
+def get_format(name: str) -> OutputFormat:
+    output_format = FORMATS.get(name)
+    if output_format is None:
+        raise ValueError(f"Unknown output format: {name}")
+    return output_format
+
+def output_extension(format: str, compress: Optional[str] = None) -> str:
+    output_format = get_format(format)
+    if output_format.columnar or compress is None:
+        return output_format.extension
+    return output_format.extension + COMPRESSION_EXTENSIONS[compress]
+
+@dataclass
+class QuestionSetIndex:
+    count: int = 0
+    states: Set[str] = field(default_factory=set)
+    cell_counts: Counter = field(default_factory=Counter)
+    questions: Set[str] = field(default_factory=set)
+    ids_contiguous: bool = True
+    id_prefix: Optional[str] = None
+    id_width: Optional[int] = None
+    
+    def add(self, record: Dict[str, str]):
+        self.count += 1
+        if self.count == 1:
+            match = _SEQUENTIAL_ID.fullmatch(record["id"])
+            if match is not None:
+                self.id_prefix, self.id_width = match.group(1), len(match.group(2))
+        if self.id_prefix is None or record["id"] != f"{self.id_prefix}{self.count:0{self.id_width}d}":
+            self.ids_contiguous = False
+        self.states.add(record["state"])
+        self.cell_counts[(record["category"], record["complexity"], record["user_persona"])] += 1
+        self.questions.add(record["question"])
+    
+    def id_scheme(self, total: Optional[int] = None) -> SequentialIds:
+        # Wider IDs would no longer sort as text after the file's existing ones.
+        if total is not None and len(str(total)) > self.id_width:
+            raise ValueError(f"{total} questions need {len(str(total))}-digit IDs but the file uses {self.id_width}; "
+                             f"generate sets that will grow with --id-width {len(str(total))} or more")
+        prefix = self.id_prefix.replace("{", "{{").replace("}", "}}")
+        return SequentialIds(prefix, self.id_width)
+
+def detect_format(path: str) -> Tuple[str, Optional[str]]:
+    compress = None
+    for name, extension in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(extension):
+            compress = name
+            path = path[:-len(extension)]
+    
+    for name in ("jsonl", "csv", "parquet", "arrow"):
+        if path.endswith(FORMATS[name].extension):
+            return name, compress
+    if path.endswith(".feather"):
+        return "arrow", compress
+    if compress is None and os.path.exists(path):
+        # Both JSON list layouts share the .json extension; the indented one opens with "[\n".
+        with open(path, 'rb') as f:
+            if f.read(2) not in (b"[\n", b""):
+                return "json-compact", compress
+    return "json", compress
+
+def read_question_index(path: str, format: Optional[str] = None, compress: Optional[str] = None) -> QuestionSetIndex:
+    if format is None:
+        format, detected = detect_format(path)
+        compress = compress or detected
+    output_format = get_format(format)
+    if output_format.columnar:
+        raise ValueError(f"Reading an index from {format} output is not supported")
+    
+    index = QuestionSetIndex()
+    with open_input(path, compress) as f:
+        for record in output_format.read_records(f):
+            index.add(record)
+    return index
+
+def append_questions(questions: Iterable[TestQuestion], path: str, format: str = "jsonl",
+                     compress: Optional[str] = None, index: Optional[QuestionSetIndex] = None) -> int:
+    empty = index.count == 0 if index is not None else read_question_index(path, format, compress).count == 0
+    return get_format(format).append(questions, path, compress, empty)
+
+@lru_cache(maxsize=None)
+def _import_orjson():
+    # orjson pulls in datetime, uuid and zoneinfo, so it is only imported once JSON is encoded.
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+def dumps_question(question: TestQuestion) -> bytes:
+    orjson = _import_orjson()
+    if orjson is not None:
+        return orjson.dumps(question)
+    return _COMPACT_ENCODER.encode(question_to_dict(question)).encode("utf-8")
+
+def encode_questions_jsonl(questions: Iterable[TestQuestion]) -> bytes:
+    orjson = _import_orjson()
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE
+        return b"".join([orjson.dumps(q, option=option) for q in questions])
+    encode = _COMPACT_ENCODER.encode
+    return "".join([f"{encode(question_to_dict(q))}\n" for q in questions]).encode("utf-8")
+
+def write_questions(questions: Union[Iterable[TestQuestion], QuestionBatch], file: Union[str, BinaryIO],
+                    format: str = "jsonl", compress: Optional[str] = None) -> int:
+    output_format = get_format(format)
+    
+    if output_format.columnar:
+        if compress is not None and compress not in output_format.codecs:
+            raise ValueError(f"{format} supports compression: {', '.join(output_format.codecs)}")
+        if not isinstance(questions, QuestionBatch):
+            questions = QuestionBatch.from_questions(questions)
+        return output_format.write_batch(questions, file, compress)
+    
+    with open_output(file, compress) as f:
+        return output_format.write(questions, f)
+
+@contextmanager
+def open_output(file: Union[str, BinaryIO], compress: Optional[str] = None) -> Iterator[BinaryIO]:
+    if compress is not None and compress not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unknown compression: {compress}")
+    if compress == "zstd":
+        zstandard = _import_optional("zstandard", "zstd compression")
+    
+    if isinstance(file, str):
+        with open(file, 'wb') as raw:
+            with open_output(raw, compress) as f:
+                yield f
+        return
+    
+    if compress == "gzip":
+        import gzip
+        with gzip.GzipFile(fileobj=file, mode='wb') as f:
+            yield f
+    elif compress == "zstd":
+        with zstandard.ZstdCompressor().stream_writer(file, closefd=False) as f:
+            yield f
+    else:
+        yield file
+
+@contextmanager
+def open_input(path: str, compress: Optional[str] = None) -> Iterator[BinaryIO]:
+    if compress == "gzip":
+        import gzip
+        with gzip.open(path, 'rb') as f:
+            yield f
+    elif compress == "zstd":
+        zstandard = _import_optional("zstandard", "zstd compression")
+        with open(path, 'rb') as raw, zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True) as reader:
+            yield io.BufferedReader(reader)
+    elif compress is None:
+        with open(path, 'rb') as f:
+            yield f
+    else:
+        raise ValueError(f"Unknown compression: {compress}")
+
+def questions_to_arrow(batch: QuestionBatch):
+    pa = _import_optional("pyarrow", "Parquet and Arrow output")
+    
+    index_types = {"B": pa.uint8(), "H": pa.uint16(), "I": pa.uint32()}
+    
+    def dictionary_column(vocabulary: List[str], codes) -> Any:
+        indices = pa.Array.from_buffers(index_types[codes.typecode], len(codes), [None, pa.py_buffer(codes)])
+        return pa.DictionaryArray.from_arrays(indices.cast(pa.int32()), pa.array(vocabulary, type=pa.string()))
+    
+    priorities = list(dict.fromkeys(PRIORITY_BY_COMPLEXITY.get(c, "medium") for c in batch.complexities))
+    priority_codes = pa.array([priorities.index(PRIORITY_BY_COMPLEXITY.get(c, "medium")) for c in batch.complexities], type=pa.int32())
+    complexity_column = dictionary_column(batch.complexities, batch.complexity_codes)
+    
+    ids = batch.ids if batch.ids is not None else [batch.question_id(position) for position in range(len(batch))]
+    return pa.table({
+        "id": pa.array(ids, type=pa.string()),
+        "question": dictionary_column(batch.questions, batch.question_codes),
+        "category": dictionary_column(batch.categories, batch.category_codes),
+        "subcategory": dictionary_column(batch.subcategories, batch.subcategory_codes),
+        "complexity": complexity_column,
+        "priority": pa.DictionaryArray.from_arrays(priority_codes.take(complexity_column.indices), pa.array(priorities, type=pa.string())),
+        "user_persona": dictionary_column(batch.personas, batch.persona_codes),
+        "state": dictionary_column(batch.states, batch.state_codes)
+    })
+
+def _import_optional(module: str, feature: str):
+    try:
+        return __import__(module)
+    except ImportError as exc:
+        raise ImportError(f"{feature} requires {module}: pip install {module}") from exc
+
+register_format(JsonFormat("json", ".json"))
+register_format(CompactJsonFormat("json-compact", ".json"))
+register_format(JsonLinesFormat("jsonl", ".jsonl"))
+register_format(CsvFormat("csv", ".csv"))
+register_format(ParquetFormat("parquet", ".parquet"))
+register_format(ArrowFormat("arrow", ".arrow"))
@@ -0,0 +1,118 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+StageHook = Callable[[str, float, int], None]
+
+class StageProfiler:
+    
+    def __init__(self, hooks: Optional[List[StageHook]] = None):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+        self.items: Counter = Counter()
+        # Time a stage spent inside another stage, and the stage it ran in; the enclosing
+        # stage already counts that time, so it is left out of the total and the shares.
+        self.nested_seconds: Dict[str, float] = defaultdict(float)
+        self.parents: Dict[str, str] = {}
+        self.hooks: List[StageHook] = list(hooks or [])
+        self._active = threading.local()
+    
+    def add_hook(self, hook: StageHook):
+        self.hooks.append(hook)
+    
+    def stage(self, name: str) -> "_Stage":
+        return _Stage(self, name)
+    
+    def record(self, name: str, seconds: float, count: int = 0, parent: Optional[str] = None):
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+        self.items[name] += count
+        if parent is not None:
+            self.nested_seconds[name] += seconds
+            self.parents[name] = parent
+        for hook in self.hooks:
+            hook(name, seconds, count)
+    
+    def count(self, name: str, count: int = 1):
+        self.items[name] += count
+    
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+        self.items.clear()
+        self.nested_seconds.clear()
+        self.parents.clear()
+    
+    def _stack(self) -> List[str]:
+        stack = getattr(self._active, "stack", None)
+        if stack is None:
+            stack = self._active.stack = []
+        return stack
+    
+    def summary(self) -> List[Dict[str, float]]:
+        total = sum(self.seconds.values()) - sum(self.nested_seconds.values())
+        rows = []
+        for name in sorted(set(self.seconds) | set(self.items), key=lambda name: -self.seconds.get(name, 0.0)):
+            seconds = self.seconds.get(name, 0.0)
+            items = self.items[name]
+            rows.append({
+                "stage": name,
+                "calls": self.calls[name],
+                "seconds": seconds,
+                "items": items,
+                "items_per_second": items / seconds if seconds and items else None,
+                "share": (seconds - self.nested_seconds.get(name, 0.0)) / total if total else 0.0,
+                "parent": self.parents.get(name)
+            })
+        return rows
+    
+    def format_table(self) -> str:
+        lines = [f"{'stage':<20} {'calls':>6} {'seconds':>10} {'share':>7} {'items':>10} {'items/s':>12}"]
+        for row in self.summary():
+            rate = row["items_per_second"]
+            # Nested stages are labelled with their parent; their share is only the time they ran on their own.
+            stage = f"{row['parent']}/{row['stage']}" if row["parent"] else row["stage"]
+            lines.append(f"{stage:<20} {row['calls']:>6} {row['seconds']:>10.4f} {row['share']:>7.1%} "
+                         f"{row['items']:>10} {rate if rate is not None else float('nan'):>12.0f}")
+        return "\n".join(lines)
+
+class _Stage:
+    __slots__ = ("profiler", "name", "count", "started")
+    
+    def __init__(self, profiler: StageProfiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.count = 0
+    
+    def __enter__(self) -> "_Stage":
+        self.profiler._stack().append(self.name)
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        seconds = time.perf_counter() - self.started
+        stack = self.profiler._stack()
+        stack.pop()
+        self.profiler.record(self.name, seconds, self.count, stack[-1] if stack else None)
+        return False
+
+@contextmanager
+def cprofile(path: Optional[str] = None) -> Iterator[cProfile.Profile]:
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+
+def format_stats(profile: cProfile.Profile, limit: int = 15, sort: str = "cumulative") -> str:
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
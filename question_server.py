@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, field, fields
+from http import HTTPStatus
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from question_formats import OutputFormat, get_format
+from simple_question_generator import (
+    ID_SCHEMES, SimpleQuestionGenerator, TestQuestion, get_state_registry, get_template_index
+)
+
+QUESTION_TYPES = ("comprehensive", "basic_services", "complex_scenarios")
+CONTENT_TYPES = {
+    "json": "application/json",
+    "json-compact": "application/json",
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+MAX_BODY_BYTES = 1 << 20
+STREAM_CHUNK_SIZE = 2000
+
+_INT_PARAMS = ("count", "seed", "shard", "num_shards")
+
+@dataclass
+class QuestionRequest:
+    count: int = 25
+    state: str = "SC"
+    state_name: Optional[str] = None
+    question_type: str = "comprehensive"
+    seed: Optional[int] = None
+    shard: int = 0
+    num_shards: int = 1
+    unique: bool = False
+    engine: str = "python"
+    format: str = "json-compact"
+    id_scheme: str = "sequential"
+    id_prefix: Optional[str] = None
+    
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> "QuestionRequest":
+        names = {f.name for f in fields(cls)}
+        unknown = sorted(set(params) - names)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {', '.join(unknown)}")
+        
+        values = {}
+        for name, value in params.items():
+            if name in _INT_PARAMS and value is not None:
+                if isinstance(value, bool):
+                    raise ValueError(f"{name} must be an integer")
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name} must be an integer") from None
+            elif name == "unique" and isinstance(value, str):
+                value = value.lower() in ("1", "true", "yes")
+            values[name] = value
+        
+        request = cls(**values)
+        if request.count < 0:
+            raise ValueError("count must be non-negative")
+        if request.question_type not in QUESTION_TYPES:
+            raise ValueError(f"question_type must be one of: {', '.join(QUESTION_TYPES)}")
+        if request.engine not in ("python", "numpy"):
+            raise ValueError("engine must be 'python' or 'numpy'")
+        if request.format not in CONTENT_TYPES:
+            raise ValueError(f"format must be one of: {', '.join(CONTENT_TYPES)}")
+        if request.id_scheme not in ID_SCHEMES:
+            raise ValueError(f"id_scheme must be one of: {', '.join(ID_SCHEMES)}")
+        return request
+    
+    def make_id_scheme(self):
+        return ID_SCHEMES[self.id_scheme](self.id_prefix)
+    
+    @property
+    def batch_key(self) -> Optional[Tuple]:
+        # Seeded, unique and sharded requests depend on their own RNG stream and
+        # allocation, so only plain random requests can share a sampling pass.
+        if self.seed is not None or self.unique or self.num_shards != 1:
+            return None
+        return (self.state, self.state_name, self.question_type, self.engine, self.id_scheme, self.id_prefix)
+
+@dataclass
+class _PendingBatch:
+    counts: List[int] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    total: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+class QuestionServer:
+    
+    def __init__(self, states: Optional[List[str]] = None,
+                 batch_window: float = 0.002,
+                 batch_max: int = 1000,
+                 stream_threshold: int = 10000,
+                 max_count: int = 10_000_000,
+                 cache_size: int = 64):
+        registered = get_state_registry()["states"]
+        self.states = list(states) if states is not None else list(registered)
+        unknown = [state for state in self.states if state not in registered]
+        if unknown:
+            raise ValueError(f"Unknown state(s): {', '.join(unknown)} (registered: {', '.join(registered)})")
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.stream_threshold = stream_threshold
+        self.max_count = max_count
+        self.cache_size = cache_size
+        self.stats = {"requests": 0, "questions": 0, "batched_requests": 0, "sampling_passes": 0}
+        self._generators: "OrderedDict[Tuple, SimpleQuestionGenerator]" = OrderedDict()
+        self._pending: Dict[Tuple, _PendingBatch] = {}
+        # Sampling is CPU-bound; one worker thread keeps the event loop free for I/O
+        # without adding GIL contention between concurrent passes.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="question-sampler")
+    
+    def warm(self):
+        for state in self.states:
+            get_template_index(state)
+    
+    async def start(self, host: str = "127.0.0.1", port: int = 8765,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.warm)
+        if unix_path:
+            return await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        return await asyncio.start_server(self._handle_connection, host, port)
+    
+    def close(self):
+        self._executor.shutdown(wait=False)
+    
+    def _generator(self, request: QuestionRequest) -> SimpleQuestionGenerator:
+        if request.seed is None:
+            return SimpleQuestionGenerator(request.state, request.state_name, id_scheme=request.make_id_scheme())
+        
+        key = (request.state, request.state_name, request.seed, request.id_scheme, request.id_prefix)
+        generator = self._generators.get(key)
+        if generator is None:
+            generator = SimpleQuestionGenerator(request.state, request.state_name, seed=request.seed,
+                                                id_scheme=request.make_id_scheme())
+            self._generators[key] = generator
+            if len(self._generators) > self.cache_size:
+                self._generators.popitem(last=False)
+        else:
+            self._generators.move_to_end(key)
+        return generator
+    
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send_error(writer, HTTPStatus.BAD_REQUEST, "Malformed request line", False)
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self._send_error(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Invalid request body size", False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                
+                if not await self._dispatch(method, target, body, writer, keep_alive):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+    
+    async def _dispatch(self, method: str, target: str, body: bytes,
+                        writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        url = urlsplit(target)
+        
+        if url.path == "/health":
+            payload = {"status": "ok", "states": self.states, "stats": self.stats}
+            await self._send(writer, HTTPStatus.OK, json.dumps(payload).encode(), "application/json", keep_alive)
+            return keep_alive
+        if url.path != "/questions":
+            await self._send_error(writer, HTTPStatus.NOT_FOUND, f"Unknown path: {url.path}", keep_alive)
+            return keep_alive
+        
+        try:
+            if method == "GET":
+                params = dict(parse_qsl(url.query))
+            elif method == "POST":
+                params = json.loads(body or b"{}")
+                if not isinstance(params, dict):
+                    raise ValueError("Request body must be a JSON object")
+            else:
+                await self._send_error(writer, HTTPStatus.METHOD_NOT_ALLOWED, f"Unsupported method: {method}", keep_alive)
+                return keep_alive
+            
+            request = QuestionRequest.from_params(params)
+            # Unserved states would otherwise fall back to the default pack and be cached per name.
+            if request.state not in self.states:
+                raise ValueError(f"Unknown state: {request.state} (served: {', '.join(self.states)})")
+            if request.count > self.max_count:
+                raise ValueError(f"count must not exceed {self.max_count}")
+            return await self._serve_questions(request, writer, keep_alive)
+        except (ValueError, ImportError) as exc:
+            await self._send_error(writer, HTTPStatus.BAD_REQUEST, str(exc), keep_alive)
+            return keep_alive
+    
+    async def _serve_questions(self, request: QuestionRequest, writer: asyncio.StreamWriter,
+                               keep_alive: bool) -> bool:
+        self.stats["requests"] += 1
+        content_type = CONTENT_TYPES[request.format]
+        output_format = get_format(request.format)
+        
+        batch_key = request.batch_key
+        if batch_key is not None and request.count <= self.batch_max:
+            questions = await self._generate_batched(batch_key, request.count)
+            body = await self._run(_encode_questions, output_format, questions, 0, True)
+            self.stats["questions"] += len(questions)
+            await self._send(writer, HTTPStatus.OK, body, content_type, keep_alive)
+            return keep_alive
+        
+        generator = self._generator(request)
+        questions = await self._run(_open_questions, generator, request)
+        headers = {"X-Question-Seed": str(generator.seed)}
+        
+        if request.count <= self.stream_threshold:
+            chunk = await self._run(_take, questions, request.count)
+            body = await self._run(_encode_questions, output_format, chunk, 0, True)
+            self.stats["questions"] += len(chunk)
+            await self._send(writer, HTTPStatus.OK, body, content_type, keep_alive, headers)
+            return keep_alive
+        
+        self._send_head(writer, HTTPStatus.OK, content_type, keep_alive,
+                        {**headers, "Transfer-Encoding": "chunked"})
+        written = 0
+        while True:
+            chunk = await self._run(_take, questions, STREAM_CHUNK_SIZE)
+            last = len(chunk) < STREAM_CHUNK_SIZE
+            data = await self._run(_encode_questions, output_format, chunk, written, last)
+            if data:
+                writer.write(b"%X\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            written += len(chunk)
+            self.stats["questions"] += len(chunk)
+            if last:
+                break
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return keep_alive
+    
+    async def _generate_batched(self, key: Tuple, count: int) -> List[TestQuestion]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            batch.timer = loop.call_later(self.batch_window, self._flush, key)
+        batch.counts.append(count)
+        batch.futures.append(future)
+        batch.total += count
+        if batch.total >= self.batch_max:
+            self._flush(key)
+        
+        return await future
+    
+    def _flush(self, key: Tuple):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        self.stats["batched_requests"] += len(batch.counts)
+        asyncio.ensure_future(self._run_batch(key, batch))
+    
+    async def _run_batch(self, key: Tuple, batch: _PendingBatch):
+        self.stats["sampling_passes"] += 1
+        try:
+            results = await self._run(_generate_many, key, batch.counts)
+        except Exception as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, questions in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(questions)
+    
+    def _send_head(self, writer: asyncio.StreamWriter, status: HTTPStatus, content_type: str,
+                         keep_alive: bool, headers: Optional[Dict[str, str]] = None):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    
+    async def _send(self, writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes, content_type: str,
+                    keep_alive: bool, headers: Optional[Dict[str, str]] = None):
+        self._send_head(writer, status, content_type, keep_alive,
+                              {**(headers or {}), "Content-Length": str(len(body))})
+        writer.write(body)
+        await writer.drain()
+    
+    async def _send_error(self, writer: asyncio.StreamWriter, status: HTTPStatus, message: str, keep_alive: bool):
+        await self._send(writer, status, json.dumps({"error": message}).encode(), "application/json", keep_alive)
+
+def _focus(generator: SimpleQuestionGenerator, question_type: str) -> Tuple[Optional[List[str]], Optional[Dict[str, Any]]]:
+    if question_type == "comprehensive":
+        return None, None
+    return generator._get_focus_config(question_type)
+
+def _open_questions(generator: SimpleQuestionGenerator, request: QuestionRequest) -> Iterator[TestQuestion]:
+    categories, complexity_override = _focus(generator, request.question_type)
+    # Seeded generators are shared between requests, so each request replays its seed's set.
+    stream = 0 if request.seed is not None else None
+    if request.engine == "numpy":
+        return iter(generator.generate_batch(request.count, categories, complexity_override, request.engine,
+                                             request.shard, request.num_shards, request.unique, stream))
+    return generator.iter_questions(request.count, categories, complexity_override,
+                                    request.shard, request.num_shards, request.unique, stream)
+
+def _generate_many(key: Tuple, counts: List[int]) -> List[List[TestQuestion]]:
+    state, state_name, question_type, engine, id_scheme, id_prefix = key
+    generator = SimpleQuestionGenerator(state, state_name, id_scheme=ID_SCHEMES[id_scheme](id_prefix))
+    categories, complexity_override = _focus(generator, question_type)
+    return generator.generate_many(counts, categories, complexity_override, engine)
+
+def _take(questions: Iterator[TestQuestion], size: int) -> List[TestQuestion]:
+    return list(islice(questions, size))
+
+def _encode_questions(output_format: OutputFormat, questions: List[TestQuestion], written: int, last: bool) -> bytes:
+    data = output_format.header() if not written else b""
+    if questions:
+        data += output_format.encode(questions, not written)
+    if last:
+        data += output_format.footer(not written and not questions)
+    return data
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None,
+                **options) -> None:
+    server = QuestionServer(**options)
+    listener = await server.start(host, port, unix_path)
+    address = unix_path or f"http://{host}:{port}"
+    print(f"Serving questions on {address} (states: {', '.join(server.states)})", file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve question sets over HTTP from warm generators')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port to listen on')
+    parser.add_argument('--unix', help='Listen on this Unix socket path instead of TCP')
+    parser.add_argument('--states', help='Comma-separated state codes to preload and serve (default: every registered state)')
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                       help='How long small random requests wait to share a sampling pass')
+    parser.add_argument('--batch-max', type=int, default=1000,
+                       help='Largest request (and combined pass size) served by request batching')
+    parser.add_argument('--stream-threshold', type=int, default=10000,
+                       help='Counts above this are streamed with chunked transfer encoding')
+    parser.add_argument('--max-count', type=int, default=10_000_000, help='Largest count a request may ask for')
+    
+    args = parser.parse_args()
+    states = [state.strip().upper() for state in args.states.split(',') if state.strip()] if args.states else None
+    
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.unix,
+            states=states,
+            batch_window=args.batch_window_ms / 1000,
+            batch_max=args.batch_max,
+            stream_threshold=args.stream_threshold,
+            max_count=args.max_count
+        ))
+    except KeyboardInterrupt:
+        pass
+    except ValueError as exc:
+        parser.error(str(exc))
+    
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
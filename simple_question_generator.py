@@ -1,10 +1,38 @@
 import json
+import math
+import os
 import random
-from typing import List, Dict, Any
-from dataclasses import dataclass, asdict
-from datetime import datetime
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from math import prod
+from string import Formatter
+from types import MappingProxyType
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence, TextIO, Tuple, Union
+from dataclasses import dataclass
 
-@dataclass
+PRIORITY_BY_COMPLEXITY = {
+    "basic": "high",
+    "intermediate": "medium",
+    "complex": "low"
+}
+
+DEFAULT_PARAPHRASES = {
+    "How do I": ("What's the process to", "Can you help me"),
+    "What are": ("Can you tell me about", "I need information about")
+}
+
+USER_PERSONAS = (
+    "general", "senior_citizen", "small_business_owner", "college_student", 
+    "new_resident", "veteran", "parent", "unemployed_person", "disabled_person"
+)
+
+@dataclass(slots=True)
 class TestQuestion:
     id: str
     question: str
@@ -15,859 +43,545 @@ class TestQuestion:
     user_persona: str = "general"
     state: str = "SC"
 
+class AliasTable:
+    __slots__ = ("probabilities", "aliases")
+    
+    def __init__(self, weights: Sequence[float], what: str = "weights"):
+        weights = _check_weights(weights, what)
+        size = len(weights)
+        if all(weight == weights[0] for weight in weights):
+            # A uniform table decodes to int(draw * size), the draw used before weights existed.
+            self.probabilities = (1.0,) * size
+            self.aliases = tuple(range(size))
+            return
+        
+        # Vose's method: every column holds its own outcome plus at most one alias.
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        probabilities = [1.0] * size
+        aliases = list(range(size))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        self.probabilities = tuple(probabilities)
+        self.aliases = tuple(aliases)
+    
+    def __len__(self) -> int:
+        return len(self.probabilities)
+    
+    def index(self, draw: float) -> int:
+        scaled = draw * len(self.probabilities)
+        index = int(scaled)
+        return index if scaled - index < self.probabilities[index] else self.aliases[index]
+    
+    def support(self) -> Tuple[int, ...]:
+        # Outcomes that can actually be drawn; zero weights keep no share of any column.
+        mass = [0.0] * len(self.probabilities)
+        for index, (probability, alias) in enumerate(zip(self.probabilities, self.aliases)):
+            mass[index] += probability
+            mass[alias] += 1.0 - probability
+        return tuple(index for index, weight in enumerate(mass) if weight > 0)
+
+class PersonaAffinity:
+    __slots__ = ("matrix", "_weights")
+    
+    def __init__(self, matrix: Mapping[str, Mapping[str, Union[float, Mapping[str, float]]]]):
+        unknown = set(matrix) - set(USER_PERSONAS)
+        if unknown:
+            raise ValueError(f"Unknown persona in affinity matrix: {', '.join(sorted(unknown))}")
+        
+        self.matrix = {}
+        for persona, row in matrix.items():
+            if not isinstance(row, Mapping):
+                raise ValueError(f"Affinity for {persona} must map categories to weights")
+            entries = {}
+            for category, entry in row.items():
+                if isinstance(entry, Mapping):
+                    unknown = set(entry) - set(PRIORITY_BY_COMPLEXITY) - {"*"}
+                    if unknown:
+                        raise ValueError(f"Unknown complexity in affinity for {persona}/{category}: {', '.join(sorted(unknown))}")
+                    entries[category] = {complexity: _affinity_weight(weight, f"{persona}/{category}/{complexity}")
+                                         for complexity, weight in entry.items()}
+                else:
+                    entries[category] = _affinity_weight(entry, f"{persona}/{category}")
+            self.matrix[persona] = entries
+        self._weights: Dict[Tuple[str, str], Tuple[float, ...]] = {}
+    
+    def __bool__(self) -> bool:
+        return bool(self.matrix)
+    
+    def weight(self, persona: str, category: str, complexity: str) -> float:
+        # The most specific entry wins: category then "*", and within it complexity then "*".
+        row = self.matrix.get(persona, {})
+        entry = row.get(category, row.get("*", 1.0))
+        if isinstance(entry, dict):
+            return entry.get(complexity, entry.get("*", 1.0))
+        return entry
+    
+    def weights(self, category: str, complexity: str) -> Tuple[float, ...]:
+        key = (category, complexity)
+        weights = self._weights.get(key)
+        if weights is None:
+            weights = self._weights[key] = tuple(self.weight(persona, category, complexity) for persona in USER_PERSONAS)
+        return weights
+
+@dataclass(frozen=True)
+class TemplateSlice:
+    starts: Tuple[int, ...]
+    counts: Tuple[int, ...]
+    unique_indices: Tuple[int, ...]
+    sizes: Tuple[int, ...]
+    alias: AliasTable
+
+class SlotTemplate:
+    __slots__ = ("text", "slot_names", "values", "size", "_format")
+    
+    def __init__(self, text: str, slots: Mapping[str, Tuple[str, ...]]):
+        pattern = []
+        slot_names = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            pattern.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if field not in slots:
+                raise ValueError(f"Unknown slot '{{{field}}}' in template: {text}")
+            if spec or conversion:
+                raise ValueError(f"Slots take no format spec or conversion: {text}")
+            pattern.append("{}")
+            slot_names.append(field)
+        
+        self.text = text
+        self.slot_names = tuple(slot_names)
+        self.values = tuple(slots[name] for name in slot_names)
+        self.size = prod(len(values) for values in self.values)
+        self._format = "".join(pattern).format
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def render(self, index: int) -> str:
+        # Mixed-radix decoding: the last slot varies fastest.
+        picked = []
+        for values in reversed(self.values):
+            index, digit = divmod(index, len(values))
+            picked.append(values[digit])
+        picked.reverse()
+        return self._format(*picked)
+    
+    def __getstate__(self):
+        return self.text, dict(zip(self.slot_names, self.values))
+    
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+class ParaphraseRules:
+    __slots__ = ("phrases", "alternatives", "_rules", "_pattern")
+    
+    def __init__(self, rules: Mapping[str, Iterable[str]]):
+        self.phrases = tuple(phrase for phrase, alternatives in rules.items() if alternatives)
+        if "" in self.phrases:
+            raise ValueError("Paraphrase phrases must not be empty")
+        self.alternatives = tuple(tuple(rules[phrase]) for phrase in self.phrases)
+        self._rules = {phrase: rule for rule, phrase in enumerate(self.phrases)}
+        # One trie-shaped pattern finds every rewrite site in a single left-to-right scan.
+        self._pattern = re.compile(_trie_pattern(self.phrases)) if self.phrases else None
+    
+    def __len__(self) -> int:
+        return len(self.phrases)
+    
+    def sites(self, text: str) -> Dict[int, List[Tuple[int, int]]]:
+        sites = {}
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                sites.setdefault(self._rules[match.group()], []).append(match.span())
+        return sites
+    
+    def variant_count(self, text: str) -> int:
+        return 1 + sum(len(self.alternatives[rule]) for rule in self.sites(text))
+    
+    def variant(self, text: str, index: int) -> str:
+        if index == 0:
+            return text
+        sites = self.sites(text)
+        offset = index - 1
+        for rule in sorted(sites):
+            alternatives = self.alternatives[rule]
+            if offset < len(alternatives):
+                return _splice(text, sites[rule], alternatives[offset])
+            offset -= len(alternatives)
+        raise IndexError(f"Paraphrase variant {index} out of range for: {text}")
+    
+    def variants(self, text: str) -> Tuple[str, ...]:
+        # The original comes first, then every alternative of each matching rule in rule order.
+        sites = self.sites(text)
+        variants = [text]
+        for rule in sorted(sites):
+            variants.extend(_splice(text, sites[rule], alternative) for alternative in self.alternatives[rule])
+        return tuple(variants)
+    
+    def __getstate__(self):
+        return dict(zip(self.phrases, self.alternatives))
+    
+    def __setstate__(self, state):
+        self.__init__(state)
+
+@dataclass(frozen=True)
+class QuestionCell:
+    category: str
+    complexity: str
+    user_persona: str
+    count: int
+
+@dataclass(frozen=True)
+class TemplateIndex:
+    state: str
+    state_name: str
+    categories: Mapping[str, Mapping[str, Any]]
+    templates: Mapping[str, Mapping[str, Tuple[str, ...]]]
+    subcategory_labels: Mapping[str, str]
+    question_pool: Tuple[str, ...]
+    template_slices: Mapping[str, Mapping[str, TemplateSlice]]
+    slot_templates: Mapping[int, SlotTemplate]
+    paraphrases: ParaphraseRules
+    subcategory_aliases: Mapping[str, AliasTable]
+
+class SequentialIds:
+    
+    def __init__(self, prefix: str = "Q", width: Optional[int] = None, min_width: int = 3):
+        self.prefix = prefix
+        self.width = width
+        self.min_width = min_width
+    
+    def bind(self, state: str, seed: Any, total: int) -> Callable[[int, str], str]:
+        # The width comes from the set size, so every shard pads identically and IDs sort as text.
+        width = self.width or max(self.min_width, len(str(total)))
+        prefix = self.prefix.format(state=state, seed=seed)
+        return lambda position, question: f"{prefix}{position + 1:0{width}d}"
+
+class ContentHashIds:
+    
+    def __init__(self, prefix: str = "Q", digest_size: int = 8):
+        self.prefix = prefix
+        self.digest_size = digest_size
+    
+    def bind(self, state: str, seed: Any, total: int) -> Callable[[int, str], str]:
+        from hashlib import blake2b
+        
+        prefix = self.prefix.format(state=state, seed=seed)
+        digest_size = self.digest_size
+        salt = f"{state}\x00{seed}\x00".encode("utf-8")
+        
+        def format_id(position: int, question: str) -> str:
+            key = salt + f"{position}\x00{question}".encode("utf-8")
+            return prefix + blake2b(key, digest_size=digest_size).hexdigest()
+        return format_id
+
+ID_SCHEMES = {
+    "sequential": lambda prefix=None, width=None: SequentialIds(prefix or "Q", width),
+    "prefixed": lambda prefix=None, width=None: SequentialIds(prefix or "{state}-{seed}-Q", width),
+    "hash": lambda prefix=None, width=None: ContentHashIds(prefix or "Q", width or 8)
+}
+
+TEMPLATE_PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template_packs")
+TEMPLATE_PACK_FORMAT = 1
+TEMPLATE_CACHE_VERSION = 4
+
+_STATE_REGISTRY: Optional[Dict[str, Any]] = None
+_TEMPLATE_INDEXES: Dict[str, TemplateIndex] = {}
+_TEMPLATE_INDEX_LOCK = threading.Lock()
+
+_NUMPY_DTYPES = {"B": "uint8", "H": "uint16", "I": "uint32"}
+
+_RNG_BLOCK_SIZE = 4096
+_DRAWS_PER_QUESTION = 3
+
+class _NullStage:
+    count = 0
+    
+    def __enter__(self) -> "_NullStage":
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        return False
+
+_NO_STAGE = _NullStage()
+
 class SimpleQuestionGenerator:
     
-    def __init__(self, state="SC", state_name="South Carolina"):
-        self.state = state
-        self.state_name = state_name
-        self.categories = self._get_state_categories()
-        self.user_personas = [
-            "general", "senior_citizen", "small_business_owner", "college_student", 
-            "new_resident", "veteran", "parent", "unemployed_person", "disabled_person"
-        ]
-        self.question_templates = self._get_state_question_templates()
+    def __init__(self, state="SC", state_name: Optional[str] = None, seed: Optional[int] = None,
+                 id_scheme: Optional[Union[SequentialIds, ContentHashIds]] = None,
+                 result_cache: Optional[Any] = None, profiler: Optional[Any] = None,
+                 category_weights: Optional[Mapping[str, float]] = None,
+                 persona_weights: Optional[Mapping[str, float]] = None,
+                 persona_affinity: Optional[Union[PersonaAffinity, Mapping[str, Any]]] = None):
+        self.profiler = profiler
+        # Only explicitly seeded sets are reproducible, so only those are looked up in the result cache.
+        self.result_cache = result_cache if seed is not None else None
+        if seed is None:
+            seed = random.getrandbits(64)
+        elif seed < 0:
+            raise ValueError("seed must be a non-negative integer")
         
-    def _get_state_categories(self) -> Dict[str, Any]:
-        base_categories = {
-            "government": {
-                "subcategories": ["voting", "licenses", "permits", "records", "elected_officials"],
-                "complexity_distribution": {"basic": 0.5, "intermediate": 0.3, "complex": 0.2}
-            },
-            "business": {
-                "subcategories": ["registration", "licenses", "permits", "taxes", "regulations"],
-                "complexity_distribution": {"basic": 0.4, "intermediate": 0.4, "complex": 0.2}
-            },
-            "employment": {
-                "subcategories": ["unemployment", "job_search", "workers_comp", "labor_rights"],
-                "complexity_distribution": {"basic": 0.6, "intermediate": 0.3, "complex": 0.1}
-            },
-            "healthcare": {
-                "subcategories": ["medicaid", "insurance", "public_health", "mental_health"],
-                "complexity_distribution": {"basic": 0.5, "intermediate": 0.4, "complex": 0.1}
-            },
-            "education": {
-                "subcategories": ["k12", "higher_ed", "financial_aid", "adult_ed"],
-                "complexity_distribution": {"basic": 0.6, "intermediate": 0.3, "complex": 0.1}
-            },
-            "transportation": {
-                "subcategories": ["dmv", "public_transit", "roads", "vehicle_registration"],
-                "complexity_distribution": {"basic": 0.7, "intermediate": 0.2, "complex": 0.1}
-            },
-            "housing": {
-                "subcategories": ["assistance", "regulations", "property_tax", "first_time_buyers"],
-                "complexity_distribution": {"basic": 0.4, "intermediate": 0.4, "complex": 0.2}
-            },
-            "taxation": {
-                "subcategories": ["income_tax", "property_tax", "business_tax", "tax_assistance"],
-                "complexity_distribution": {"basic": 0.3, "intermediate": 0.5, "complex": 0.2}
-            },
-            "recreation": {
-                "subcategories": ["parks", "hunting_fishing", "tourism", "events"],
-                "complexity_distribution": {"basic": 0.8, "intermediate": 0.2, "complex": 0.0}
-            },
-            "seniors": {
-                "subcategories": ["benefits", "healthcare", "housing", "transportation"],
-                "complexity_distribution": {"basic": 0.6, "intermediate": 0.3, "complex": 0.1}
-            }
-        }
+        with self._stage("template_index"):
+            self._index = get_template_index(state)
+        self.state = state
+        self.state_name = state_name or self._index.state_name
+        self.seed = seed
+        self.id_scheme = id_scheme or SequentialIds()
+        self._legacy_rng: Optional[random.Random] = None
+        self._stream = 0
+        self._stream_lock = threading.Lock()
+        self.categories = self._index.categories
+        self.user_personas = USER_PERSONAS
+        self.question_templates = self._index.templates
+        self.category_weights = _weight_mapping(category_weights, self.categories, "category")
+        self.persona_weights = _weight_mapping(persona_weights, self.user_personas, "persona")
+        if persona_affinity is not None and not isinstance(persona_affinity, PersonaAffinity):
+            persona_affinity = PersonaAffinity(persona_affinity)
+        self.persona_affinity = persona_affinity or None
+    
+    @property
+    def _rng(self) -> random.Random:
+        # Only the legacy helpers called without draws use this, so it is seeded on first use.
+        if self._legacy_rng is None:
+            self._legacy_rng = random.Random(self.seed)
+        return self._legacy_rng
+    
+    @staticmethod
+    def _get_state_categories(state: str) -> Dict[str, Any]:
+        return load_template_pack(state)["categories"]
+    
+    @staticmethod
+    def _get_state_question_templates(state: str) -> Dict[str, Any]:
+        return load_template_pack(state)["templates"]
+    
+    def generate_questions(self, num_questions: int = 50, 
+                          categories: List[str] = None,
+                          complexity_override: Dict[str, float] = None,
+                          engine: str = "python",
+                          shard: int = 0,
+                          num_shards: int = 1,
+                          unique: bool = False,
+                          stream: Optional[int] = None) -> List[TestQuestion]:
         
-        if self.state == "HI":
-            base_categories["environment"] = {
-                "subcategories": ["conservation", "marine_life", "hunting_fishing", "permits", "research"],
-                "complexity_distribution": {"basic": 0.5, "intermediate": 0.3, "complex": 0.2}
-            }
+        if categories is None:
+            categories = list(self.categories.keys())
         
-        return base_categories
+        if engine == "numpy":
+            if unique:
+                raise ValueError("unique sampling is only supported by the python engine")
+            return self._materialize(self.generate_batch(num_questions, categories, complexity_override, engine, shard, num_shards, stream=stream))
+        if engine != "python":
+            raise ValueError(f"Unknown generation engine: {engine}")
+        if self.result_cache is not None:
+            return self._materialize(self.generate_batch(num_questions, categories, complexity_override, engine, shard, num_shards, unique, stream))
         
-    def _get_state_question_templates(self) -> Dict[str, Any]:
-        if self.state == "HI":
-            return self._get_hawaii_templates()
-        elif self.state == "IN":
-            return self._get_indiana_templates()
-        elif self.state == "MS":
-            return self._get_mississippi_templates()
-        else:
-            return self._get_south_carolina_templates()
+        # Sampling and TestQuestion construction are interleaved here, so they share one stage;
+        # allocate is reported as a nested stage of it.
+        with self._stage("generate") as stage:
+            questions = list(self.iter_questions(num_questions, categories, complexity_override, shard, num_shards, unique, stream))
+            stage.count = len(questions)
+        return questions
     
-    def _get_south_carolina_templates(self) -> Dict[str, Any]:
-        return {
-            "government": {
-                "basic": [
-                    "How do I register to vote in South Carolina?",
-                    "Where can I get a copy of my birth certificate?",
-                    "What are the hours for the DMV?",
-                    "How do I contact my state representative?",
-                    "What documents do I need to get a state ID?",
-                    "How do I find my polling location?",
-                    "Where can I get a copy of my marriage certificate?",
-                    "How do I register my vehicle?",
-                    "What are the requirements for a concealed carry permit?",
-                    "How do I get a passport in South Carolina?",
-                    "Where can I pay my property taxes?",
-                    "How do I change my voter registration address?",
-                    "What documents do I need for a REAL ID?",
-                    "How do I request an absentee ballot?",
-                    "Where can I find information about jury duty?"
-                ],
-                "intermediate": [
-                    "What are the requirements for running for local office in South Carolina?",
-                    "How do I request public records from a state agency?",
-                    "What is the process for appealing a government decision?",
-                    "How can I file a complaint against a state employee?",
-                    "How do I petition for a new traffic light in my neighborhood?",
-                    "What is the process for changing my name legally?",
-                    "How do I apply for a notary public commission?",
-                    "What are the steps to become a poll worker?",
-                    "How do I request a hearing for a code violation?",
-                    "What is required to establish a nonprofit organization?",
-                    "How do I appeal a property tax assessment?",
-                    "What are the requirements for homeschooling registration?"
-                ],
-                "complex": [
-                    "How do I navigate the state procurement process for government contracts?",
-                    "What are my rights under South Carolina's Freedom of Information Act?",
-                    "How do I petition the state legislature for a new law?",
-                    "What is the process for challenging an election result?",
-                    "How do I navigate constitutional rights violations by state agencies?",
-                    "What are the procedures for whistleblower protection in state government?",
-                    "How do I initiate a ballot measure or referendum?",
-                    "What are my rights during eminent domain proceedings?"
-                ]
-            },
-            "business": {
-                "basic": [
-                    "How do I register a business in South Carolina?",
-                    "What business licenses do I need to start a restaurant?",
-                    "How do I get a tax ID number for my business?",
-                    "Where can I find information about business taxes?",
-                    "How do I register a DBA (doing business as) name?",
-                    "What permits do I need for a food truck?",
-                    "How do I get a resale certificate?",
-                    "What are the requirements for a home-based business?",
-                    "How do I apply for a liquor license?",
-                    "What business insurance is required in South Carolina?",
-                    "How do I register for workers' compensation?",
-                    "What are the steps to dissolve a business?",
-                    "How do I get a contractor's license?",
-                    "What permits are needed for a beauty salon?",
-                    "How do I apply for a retail merchant certificate?"
-                ],
-                "intermediate": [
-                    "What are the zoning requirements for opening a retail store?",
-                    "How do I apply for a state business grant?",
-                    "What are the worker's compensation requirements for employers?",
-                    "How do I register for state sales tax collection?",
-                    "What are the requirements for minority business certification?",
-                    "How do I comply with ADA requirements for my business?",
-                    "What environmental permits do I need for manufacturing?",
-                    "How do I handle business closures due to health violations?",
-                    "What are the requirements for professional licensing boards?",
-                    "How do I set up a business retirement plan?",
-                    "What are the export/import regulations for businesses?",
-                    "How do I navigate business partnership disputes legally?"
-                ],
-                "complex": [
-                    "What are the environmental regulations for manufacturing businesses?",
-                    "How do I comply with state employment law for a multi-location business?",
-                    "What are the requirements for government contracting certification?",
-                    "How do I navigate complex tax incentive programs for businesses?",
-                    "What are the compliance requirements for publicly traded companies?",
-                    "How do I handle multi-state business operations and regulations?",
-                    "What are the requirements for international business operations?",
-                    "How do I navigate intellectual property protections at the state level?"
-                ]
-            },
-            "employment": {
-                "basic": [
-                    "How do I apply for unemployment benefits?",
-                    "Where can I find job training programs?",
-                    "How do I file a workplace injury claim?",
-                    "What are the minimum wage laws in South Carolina?",
-                    "How do I search for state government jobs?",
-                    "What are the requirements for temp work agencies?",
-                    "How do I get my final paycheck after termination?",
-                    "Where can I find apprenticeship programs?",
-                    "How do I report unpaid wages?",
-                    "What are my rights as a seasonal worker?",
-                    "How do I apply for disability benefits?",
-                    "Where can I get help with resume writing?",
-                    "What job placement services are available?",
-                    "How do I verify my employment eligibility?",
-                    "What are the child labor laws in South Carolina?"
-                ],
-                "intermediate": [
-                    "How do I report workplace discrimination?",
-                    "What retraining programs are available for displaced workers?",
-                    "How do I appeal an unemployment benefits denial?",
-                    "What are my rights during a workplace investigation?",
-                    "How do I file for reasonable accommodation at work?",
-                    "What is the process for reporting unsafe working conditions?",
-                    "How do I handle workplace harassment complaints?",
-                    "What are the requirements for employee leave policies?",
-                    "How do I navigate layoffs and plant closures?",
-                    "What protections exist for whistleblowers in employment?",
-                    "How do I challenge a wrongful termination?",
-                    "What are my rights regarding overtime and breaks?"
-                ],
-                "complex": [
-                    "What are my rights under the Family and Medical Leave Act in South Carolina?",
-                    "How do I file a complex workers' compensation claim?",
-                    "How do I navigate employment law for union activities?",
-                    "What are the procedures for employment-related lawsuits?",
-                    "How do I handle multi-employer pension plan issues?",
-                    "What are the requirements for executive compensation disclosure?",
-                    "How do I navigate employment contracts and non-compete agreements?",
-                    "What are the complex disability accommodation requirements?"
-                ]
-            },
-            "healthcare": {
-                "basic": [
-                    "How do I apply for Medicaid in South Carolina?",
-                    "Where can I find free health clinics?",
-                    "How do I get help with prescription drug costs?",
-                    "What mental health services are available?",
-                    "How do I find dental care assistance programs?",
-                    "Where can I get immunizations for my children?",
-                    "How do I apply for emergency medical assistance?",
-                    "What substance abuse treatment programs are available?",
-                    "How do I get vision care assistance?",
-                    "Where can I find prenatal care services?",
-                    "How do I access senior health programs?",
-                    "What health screenings are available for free?",
-                    "How do I get help with medical transportation?",
-                    "Where can I find WIC program information?",
-                    "How do I report a healthcare complaint?"
-                ],
-                "intermediate": [
-                    "How do I appeal a Medicaid denial?",
-                    "What are the eligibility requirements for state health insurance programs?",
-                    "How do I find specialized medical care through state programs?",
-                    "What are the requirements for home health aide services?",
-                    "How do I navigate Medicare supplement programs?",
-                    "What mental health crisis intervention services exist?",
-                    "How do I access rehabilitation services after injury?",
-                    "What are the procedures for medical disability determinations?",
-                    "How do I get second opinions through state programs?",
-                    "What are the requirements for nursing home placement?",
-                    "How do I navigate health insurance appeals processes?",
-                    "What support exists for caregivers of disabled family members?"
-                ],
-                "complex": [
-                    "How do I navigate the state's health insurance marketplace with complex medical needs?",
-                    "What are my options for long-term care coverage through state programs?",
-                    "How do I coordinate benefits across multiple health programs?",
-                    "What are the requirements for experimental treatment coverage?",
-                    "How do I navigate medical malpractice complaint processes?",
-                    "What are the procedures for healthcare advance directives?",
-                    "How do I handle complex disability benefit determinations?",
-                    "What are the requirements for medical research participation?"
-                ]
-            },
-            "transportation": {
-                "basic": [
-                    "How do I renew my driver's license?",
-                    "What documents do I need to register my car?",
-                    "How much does it cost to get a new license plate?",
-                    "Where is the nearest DMV office?",
-                    "How do I get a replacement driver's license?",
-                    "What are the requirements for a motorcycle license?",
-                    "How do I register a boat in South Carolina?",
-                    "What do I need to transfer vehicle ownership?",
-                    "How do I get a temporary vehicle permit?",
-                    "What are the requirements for disabled parking permits?",
-                    "How do I report a vehicle accident?",
-                    "Where can I find public transportation schedules?",
-                    "How do I get a vehicle inspection?",
-                    "What are the requirements for teen driver permits?",
-                    "How do I contest a parking ticket?"
-                ],
-                "intermediate": [
-                    "How do I transfer my out-of-state license to South Carolina?",
-                    "What are the requirements for getting a commercial driver's license?",
-                    "How do I contest a traffic ticket?",
-                    "What are the procedures for vehicle emission testing?",
-                    "How do I get a salvage vehicle title?",
-                    "What are the requirements for commercial vehicle registration?",
-                    "How do I handle insurance disputes after accidents?",
-                    "What are the procedures for license suspension appeals?",
-                    "How do I get a restricted license after DUI?",
-                    "What are the requirements for driver education programs?",
-                    "How do I register an out-of-state vehicle purchase?",
-                    "What are the procedures for vehicle lien releases?"
-                ],
-                "complex": [
-                    "How do I get a special permit for transporting oversized loads?",
-                    "What are the requirements for becoming a ride-share driver in South Carolina?",
-                    "How do I navigate complex commercial transportation regulations?",
-                    "What are the procedures for establishing a transportation business?",
-                    "How do I handle multi-state commercial driver licensing?",
-                    "What are the requirements for hazardous materials transportation?",
-                    "How do I navigate vehicle safety compliance for fleet operations?",
-                    "What are the procedures for transportation-related legal disputes?"
-                ]
-            },
-            "education": {
-                "basic": [
-                    "How do I register my child for public school?",
-                    "What are the homeschooling requirements in South Carolina?",
-                    "How do I apply for college financial aid?",
-                    "Where can I find adult education programs?",
-                    "What are the requirements for GED testing?",
-                    "How do I transfer schools within the district?",
-                    "What special education services are available?",
-                    "How do I apply for school choice options?",
-                    "What are the vaccination requirements for school?",
-                    "How do I get transcripts from South Carolina schools?",
-                    "What early childhood education programs exist?",
-                    "How do I report bullying in schools?",
-                    "What are the requirements for teacher certification?",
-                    "How do I access free lunch programs?",
-                    "What tutoring services are available?"
-                ],
-                "intermediate": [
-                    "How do I appeal a special education placement decision?",
-                    "What are the procedures for school disciplinary hearings?",
-                    "How do I navigate college admission appeals?",
-                    "What are the requirements for professional development for teachers?",
-                    "How do I establish a charter school?",
-                    "What are the procedures for educational discrimination complaints?",
-                    "How do I access vocational rehabilitation services?",
-                    "What are the requirements for dual enrollment programs?",
-                    "How do I handle custody-related school enrollment issues?",
-                    "What are the procedures for educational records disputes?",
-                    "How do I navigate homeschool compliance monitoring?",
-                    "What support exists for students with disabilities transitioning to college?"
-                ],
-                "complex": [
-                    "How do I navigate special education due process hearings?",
-                    "What are the procedures for educational malpractice claims?",
-                    "How do I handle complex custody and educational rights disputes?",
-                    "What are the requirements for establishing educational foundations?",
-                    "How do I navigate federal education compliance issues?",
-                    "What are the procedures for teacher tenure and dismissal processes?",
-                    "How do I handle complex financial aid and student debt issues?",
-                    "What are the requirements for educational research and data collection?"
-                ]
-            },
-            "housing": {
-                "basic": [
-                    "How do I apply for public housing assistance?",
-                    "What are the requirements for first-time homebuyer programs?",
-                    "How do I report housing discrimination?",
-                    "Where can I find rental assistance programs?",
-                    "What are tenant rights in South Carolina?",
-                    "How do I apply for housing vouchers?",
-                    "What are the requirements for landlord licensing?",
-                    "How do I get help with utility deposits?",
-                    "What assistance exists for homeless individuals?",
-                    "How do I report unsafe housing conditions?",
-                    "What are the requirements for mobile home installation?",
-                    "How do I access emergency housing assistance?",
-                    "What programs help with home repairs?",
-                    "How do I understand my lease agreement?",
-                    "What are the procedures for security deposit disputes?"
-                ],
-                "intermediate": [
-                    "How do I navigate the eviction process as a tenant?",
-                    "What are the requirements for becoming a landlord?",
-                    "How do I appeal a housing assistance denial?",
-                    "What are the procedures for housing code violations?",
-                    "How do I access disability-accessible housing modifications?",
-                    "What are the requirements for manufactured housing communities?",
-                    "How do I handle neighbor disputes and mediation?",
-                    "What are the procedures for rent stabilization programs?",
-                    "How do I navigate fair housing complaint processes?",
-                    "What are the requirements for senior housing programs?",
-                    "How do I access weatherization assistance programs?",
-                    "What support exists for transitioning from homelessness?"
-                ],
-                "complex": [
-                    "How do I navigate complex landlord-tenant legal disputes?",
-                    "What are the procedures for housing development and zoning appeals?",
-                    "How do I handle multi-family housing compliance issues?",
-                    "What are the requirements for affordable housing development?",
-                    "How do I navigate complex fair housing litigation?",
-                    "What are the procedures for housing trust fund applications?",
-                    "How do I handle property management licensing and regulations?",
-                    "What are the requirements for community land trust development?"
-                ]
-            },
-            "taxation": {
-                "basic": [
-                    "How do I file my state income tax return?",
-                    "What are the property tax rates in my area?",
-                    "How do I pay my vehicle taxes?",
-                    "Where can I get free tax preparation help?",
-                    "What are the sales tax rates in South Carolina?",
-                    "How do I appeal my property tax assessment?",
-                    "What tax credits are available for families?",
-                    "How do I get copies of past tax returns?",
-                    "What are the requirements for business tax registration?",
-                    "How do I set up a payment plan for back taxes?",
-                    "What are the tax implications of retirement income?",
-                    "How do I report changes in property ownership?",
-                    "What are the requirements for senior tax exemptions?",
-                    "How do I handle tax issues after a spouse's death?",
-                    "What are the deadlines for various tax filings?"
-                ],
-                "intermediate": [
-                    "How do I navigate tax audits and examinations?",
-                    "What are the procedures for tax lien resolution?",
-                    "How do I handle multi-state tax obligations?",
-                    "What are the requirements for tax-exempt status?",
-                    "How do I appeal tax penalties and interest charges?",
-                    "What are the procedures for installment agreements?",
-                    "How do I navigate business tax compliance for multiple locations?",
-                    "What are the requirements for agricultural tax exemptions?",
-                    "How do I handle estate and inheritance tax issues?",
-                    "What are the procedures for tax refund disputes?",
-                    "How do I navigate workers' compensation tax issues?",
-                    "What are the requirements for charitable organization tax exemptions?"
-                ],
-                "complex": [
-                    "How do I navigate complex business tax restructuring?",
-                    "What are the procedures for tax court litigation?",
-                    "How do I handle international tax compliance issues?",
-                    "What are the requirements for complex estate tax planning?",
-                    "How do I navigate tax implications of business mergers?",
-                    "What are the procedures for tax shelter and compliance issues?",
-                    "How do I handle complex property tax appeals for commercial properties?",
-                    "What are the requirements for tax-advantaged investment structures?"
-                ]
-            },
-            "recreation": {
-                "basic": [
-                    "How do I get a fishing license in South Carolina?",
-                    "What are the hunting seasons and regulations?",
-                    "How do I reserve a campsite in state parks?",
-                    "Where can I find information about hiking trails?",
-                    "What are the requirements for boating licenses?",
-                    "How do I get permits for large events in parks?",
-                    "What recreational programs are available for seniors?",
-                    "How do I register for youth sports programs?",
-                    "What are the fees for park admissions?",
-                    "How do I report wildlife violations?",
-                    "What beach access regulations exist?",
-                    "How do I get information about guided tours?",
-                    "What are the rules for camping and RVs?",
-                    "How do I access disability-friendly recreational facilities?",
-                    "What seasonal recreational activities are available?"
-                ],
-                "intermediate": [
-                    "How do I get commercial fishing permits?",
-                    "What are the requirements for hunting guide licenses?",
-                    "How do I organize charity events in state facilities?",
-                    "What are the procedures for environmental education programs?",
-                    "How do I get permits for film/photography in parks?",
-                    "What are the requirements for recreational vehicle operations?",
-                    "How do I navigate liability issues for recreational activities?",
-                    "What are the procedures for establishing recreational clubs?",
-                    "How do I get permits for water sports and activities?",
-                    "What are the requirements for recreational facility management?",
-                    "How do I access grants for community recreational programs?",
-                    "What are the procedures for recreational safety compliance?"
-                ],
-                "complex": [
-                    "How do I navigate complex environmental regulations for recreational development?",
-                    "What are the procedures for establishing new state recreational facilities?",
-                    "How do I handle complex liability and insurance issues for recreational businesses?",
-                    "What are the requirements for multi-jurisdictional recreational partnerships?",
-                    "How do I navigate federal and state coordination for recreational land use?",
-                    "What are the procedures for recreational resource conservation planning?",
-                    "How do I handle complex permitting for recreational infrastructure development?",
-                    "What are the requirements for recreational facility accessibility compliance?"
-                ]
-            },
-            "seniors": {
-                "basic": [
-                    "What senior services are available in South Carolina?",
-                    "How do I apply for senior housing assistance?",
-                    "What transportation options exist for seniors?",
-                    "How do I get help with prescription drug costs?",
-                    "What meal programs are available for seniors?",
-                    "How do I apply for senior discounts on utilities?",
-                    "What health screenings are available for seniors?",
-                    "How do I get help with Medicare enrollment?",
-                    "What senior centers are in my area?",
-                    "How do I report elder abuse or neglect?",
-                    "What social activities are available for seniors?",
-                    "How do I get assistance with home modifications?",
-                    "What are the requirements for senior property tax exemptions?",
-                    "How do I access senior legal aid services?",
-                    "What volunteer opportunities exist for seniors?"
-                ],
-                "intermediate": [
-                    "How do I navigate Medicare supplement insurance options?",
-                    "What are the procedures for guardianship and conservatorship?",
-                    "How do I access adult day care services?",
-                    "What are the requirements for nursing home placement?",
-                    "How do I handle financial exploitation of seniors?",
-                    "What are the procedures for advance healthcare directives?",
-                    "How do I navigate long-term care insurance options?",
-                    "What support exists for family caregivers?",
-                    "How do I access respite care services?",
-                    "What are the procedures for senior employment programs?",
-                    "How do I navigate retirement benefit coordination?",
-                    "What are the requirements for senior housing modifications?"
-                ],
-                "complex": [
-                    "How do I navigate complex estate planning and elder law issues?",
-                    "What are the procedures for complex Medicaid planning and asset protection?",
-                    "How do I handle multi-generational family care coordination?",
-                    "What are the requirements for establishing senior living communities?",
-                    "How do I navigate complex disability and aging service coordination?",
-                    "What are the procedures for elder abuse prosecution and legal remedies?",
-                    "How do I handle complex healthcare decision-making for incapacitated seniors?",
-                    "What are the requirements for aging-in-place community development programs?"
-                ]
-            }
-        }
+    def _materialize(self, batch: "QuestionBatch") -> List[TestQuestion]:
+        with self._stage("materialize") as stage:
+            questions = list(batch)
+            stage.count = len(questions)
+        return questions
+    
+    def _stage(self, name: str):
+        return _NO_STAGE if self.profiler is None else self.profiler.stage(name)
+    
+    def iter_questions(self, num_questions: int = 50,
+                       categories: List[str] = None,
+                       complexity_override: Dict[str, float] = None,
+                       shard: int = 0,
+                       num_shards: int = 1,
+                       unique: bool = False,
+                       stream: Optional[int] = None) -> Iterator[TestQuestion]:
         
-    def _get_hawaii_templates(self) -> Dict[str, Any]:
-        return {
-            "government": {
-                "basic": [
-                    "How do I register to vote in Hawaii?",
-                    "Where can I get a copy of my birth certificate?",
-                    "What are the hours for the DMV?",
-                    "How do I contact my state representative?",
-                    "What documents do I need to get a state ID?"
-                ],
-                "intermediate": [
-                    "What are the requirements for running for local office in Hawaii?",
-                    "How do I request public records from a state agency?",
-                    "What is the process for appealing a government decision?",
-                    "How can I file a complaint against a state employee?"
-                ],
-                "complex": [
-                    "How do I navigate the state procurement process for government contracts?",
-                    "What are my rights under Hawaii's Sunshine Law (open meetings)?",
-                    "How do I petition the state legislature for a new law?"
-                ]
-            },
-            "business": {
-                "basic": [
-                    "How do I register a business in Hawaii?",
-                    "What business licenses do I need to start a restaurant?",
-                    "How do I get a tax ID number for my business?",
-                    "Where can I find information about business taxes?"
-                ],
-                "intermediate": [
-                    "What are the zoning requirements for opening a retail store?",
-                    "How do I apply for a state business grant?",
-                    "What are the worker's compensation requirements for employers?",
-                    "How do I register for state sales tax collection?"
-                ],
-                "complex": [
-                    "What are the environmental regulations for manufacturing businesses?",
-                    "How do I comply with state employment law for a multi-location business?",
-                    "What are the requirements for government contracting certification?"
-                ]
-            },
-            "employment": {
-                "basic": [
-                    "How do I apply for unemployment benefits?",
-                    "Where can I find job training programs?",
-                    "How do I file a workplace injury claim?",
-                    "What are the minimum wage laws in Hawaii?"
-                ],
-                "intermediate": [
-                    "How do I report workplace discrimination?",
-                    "What retraining programs are available for displaced workers?",
-                    "How do I appeal an unemployment benefits denial?"
-                ],
-                "complex": [
-                    "What are my rights under the Family and Medical Leave Act in Hawaii?",
-                    "How do I file a complex workers' compensation claim?"
-                ]
-            },
-            "healthcare": {
-                "basic": [
-                    "How do I apply for Medicaid in Hawaii?",
-                    "Where can I find free health clinics?",
-                    "How do I get help with prescription drug costs?",
-                    "What mental health services are available?"
-                ],
-                "intermediate": [
-                    "How do I appeal a Medicaid denial?",
-                    "What are the eligibility requirements for state health insurance programs?",
-                    "How do I find specialized medical care through state programs?"
-                ],
-                "complex": [
-                    "How do I navigate the state's health insurance marketplace with complex medical needs?",
-                    "What are my options for long-term care coverage through state programs?"
-                ]
-            },
-            "transportation": {
-                "basic": [
-                    "How do I renew my driver's license?",
-                    "What documents do I need to register my car?",
-                    "How much does it cost to get a new license plate?",
-                    "Where is the nearest DMV office?"
-                ],
-                "intermediate": [
-                    "How do I transfer my out-of-state license to Hawaii?",
-                    "What are the requirements for getting a commercial driver's license?",
-                    "How do I contest a traffic ticket?"
-                ],
-                "complex": [
-                    "How do I get a special permit for transporting oversized loads?",
-                    "What are the requirements for becoming a ride-share driver in Hawaii?"
-                ]
-            },
-            "environment": {
-                "basic": [
-                    "How do I report an environmental concern to DLNR?",
-                    "What are the fishing license requirements?",
-                    "How do I get a hunting permit in Hawaii?",
-                    "Where can I find information about protected marine areas?"
-                ],
-                "intermediate": [
-                    "How do I apply for a permit to conduct research in state waters?",
-                    "What are the regulations for commercial fishing?",
-                    "How do I report illegal hunting or fishing activities?"
-                ],
-                "complex": [
-                    "What permits do I need for commercial ocean activities?",
-                    "How do I apply for an environmental impact assessment?",
-                    "What are the requirements for aquaculture operations?"
-                ]
-            }
-        }
+        if categories is None:
+            categories = list(self.categories.keys())
         
-    def _get_indiana_templates(self) -> Dict[str, Any]:
-        return {
-            "government": {
-                "basic": [
-                    "How do I register to vote in Indiana?",
-                    "Where can I get a copy of my birth certificate?",
-                    "What are the hours for the BMV?",
-                    "How do I contact my state representative?",
-                    "What documents do I need to get a state ID?"
-                ],
-                "intermediate": [
-                    "What are the requirements for running for local office in Indiana?",
-                    "How do I request public records from a state agency?",
-                    "What is the process for appealing a government decision?",
-                    "How can I file a complaint against a state employee?"
-                ],
-                "complex": [
-                    "How do I navigate the state procurement process for government contracts?",
-                    "What are my rights under Indiana's Access to Public Records Act?",
-                    "How do I petition the state legislature for a new law?"
-                ]
-            },
-            "business": {
-                "basic": [
-                    "How do I register a business in Indiana?",
-                    "What business licenses do I need to start a restaurant?",
-                    "How do I get a tax ID number for my business?",
-                    "Where can I find information about business taxes?"
-                ],
-                "intermediate": [
-                    "What are the zoning requirements for opening a retail store?",
-                    "How do I apply for a state business grant?",
-                    "What are the worker's compensation requirements for employers?",
-                    "How do I register for state sales tax collection?"
-                ],
-                "complex": [
-                    "What are the environmental regulations for manufacturing businesses?",
-                    "How do I comply with state employment law for a multi-location business?",
-                    "What are the requirements for government contracting certification?"
-                ]
-            },
-            "employment": {
-                "basic": [
-                    "How do I apply for unemployment benefits?",
-                    "Where can I find job training programs?",
-                    "How do I file a workplace injury claim?",
-                    "What are the minimum wage laws in Indiana?"
-                ],
-                "intermediate": [
-                    "How do I report workplace discrimination?",
-                    "What retraining programs are available for displaced workers?",
-                    "How do I appeal an unemployment benefits denial?"
-                ],
-                "complex": [
-                    "What are my rights under the Family and Medical Leave Act in Indiana?",
-                    "How do I file a complex workers' compensation claim?"
-                ]
-            },
-            "healthcare": {
-                "basic": [
-                    "How do I apply for Medicaid in Indiana?",
-                    "Where can I find free health clinics?",
-                    "How do I get help with prescription drug costs?",
-                    "What mental health services are available?"
-                ],
-                "intermediate": [
-                    "How do I appeal a Medicaid denial?",
-                    "What are the eligibility requirements for state health insurance programs?",
-                    "How do I find specialized medical care through state programs?"
-                ],
-                "complex": [
-                    "How do I navigate the state's health insurance marketplace with complex medical needs?",
-                    "What are my options for long-term care coverage through state programs?"
-                ]
-            },
-            "transportation": {
-                "basic": [
-                    "How do I renew my driver's license?",
-                    "What documents do I need to register my car?",
-                    "How much does it cost to get a new license plate?",
-                    "Where is the nearest BMV office?"
-                ],
-                "intermediate": [
-                    "How do I transfer my out-of-state license to Indiana?",
-                    "What are the requirements for getting a commercial driver's license?",
-                    "How do I contest a traffic ticket?"
-                ],
-                "complex": [
-                    "How do I get a special permit for transporting oversized loads?",
-                    "What are the requirements for becoming a ride-share driver in Indiana?"
-                ]
-            }
-        }
+        stream = self._next_stream(num_shards, stream)
+        start, stop = _shard_bounds(num_questions, shard, num_shards)
+        cells = self.allocate_questions(num_questions, categories, complexity_override, stream)
         
-    def _get_mississippi_templates(self) -> Dict[str, Any]:
-        return {
-            "government": {
-                "basic": [
-                    "How do I register to vote in Mississippi?",
-                    "Where can I get a copy of my birth certificate?",
-                    "What are the hours for the DPS?",
-                    "How do I contact my state representative?",
-                    "What documents do I need to get a state ID?"
-                ],
-                "intermediate": [
-                    "What are the requirements for running for local office in Mississippi?",
-                    "How do I request public records from a state agency?",
-                    "What is the process for appealing a government decision?",
-                    "How can I file a complaint against a state employee?"
-                ],
-                "complex": [
-                    "How do I navigate the state procurement process for government contracts?",
-                    "What are my rights under Mississippi's Public Records Act?",
-                    "How do I petition the state legislature for a new law?"
-                ]
-            },
-            "business": {
-                "basic": [
-                    "How do I register a business in Mississippi?",
-                    "What business licenses do I need to start a restaurant?",
-                    "How do I get a tax ID number for my business?",
-                    "Where can I find information about business taxes?"
-                ],
-                "intermediate": [
-                    "What are the zoning requirements for opening a retail store?",
-                    "How do I apply for a state business grant?",
-                    "What are the worker's compensation requirements for employers?",
-                    "How do I register for state sales tax collection?"
-                ],
-                "complex": [
-                    "What are the environmental regulations for manufacturing businesses?",
-                    "How do I comply with state employment law for a multi-location business?",
-                    "What are the requirements for government contracting certification?"
-                ]
-            },
-            "employment": {
-                "basic": [
-                    "How do I apply for unemployment benefits?",
-                    "Where can I find job training programs?",
-                    "How do I file a workplace injury claim?",
-                    "What are the minimum wage laws in Mississippi?"
-                ],
-                "intermediate": [
-                    "How do I report workplace discrimination?",
-                    "What retraining programs are available for displaced workers?",
-                    "How do I appeal an unemployment benefits denial?"
-                ],
-                "complex": [
-                    "What are my rights under the Family and Medical Leave Act in Mississippi?",
-                    "How do I file a complex workers' compensation claim?"
-                ]
-            },
-            "healthcare": {
-                "basic": [
-                    "How do I apply for Medicaid in Mississippi?",
-                    "Where can I find free health clinics?",
-                    "How do I get help with prescription drug costs?",
-                    "What mental health services are available?"
-                ],
-                "intermediate": [
-                    "How do I appeal a Medicaid denial?",
-                    "What are the eligibility requirements for state health insurance programs?",
-                    "How do I find specialized medical care through state programs?"
-                ],
-                "complex": [
-                    "How do I navigate the state's health insurance marketplace with complex medical needs?",
-                    "What are my options for long-term care coverage through state programs?"
-                ]
-            },
-            "transportation": {
-                "basic": [
-                    "How do I renew my driver's license?",
-                    "What documents do I need to register my car?",
-                    "How much does it cost to get a new license plate?",
-                    "Where is the nearest DPS office?"
-                ],
-                "intermediate": [
-                    "How do I transfer my out-of-state license to Mississippi?",
-                    "What are the requirements for getting a commercial driver's license?",
-                    "How do I contest a traffic ticket?"
-                ],
-                "complex": [
-                    "How do I get a special permit for transporting oversized loads?",
-                    "What are the requirements for becoming a ride-share driver in Mississippi?"
-                ]
-            }
-        }
+        unique_pool = None
+        if unique:
+            if num_shards != 1:
+                raise ValueError("unique sampling cannot be sharded")
+            unique_pool = _UniqueQuestionPool(self, categories)
+            unique_pool.check_capacity(num_questions)
         
-    def generate_questions(self, num_questions: int = 50, 
-                          categories: List[str] = None,
-                          complexity_override: Dict[str, float] = None) -> List[TestQuestion]:
+        return self._iter_questions(cells, start, stop, unique_pool, stream=stream)
+    
+    def _next_stream(self, num_shards: int = 1, stream: Optional[int] = None) -> int:
+        # Stream 0 is the seeded set, and shards always slice it so they can be generated apart.
+        # Every other call takes the next stream, so repeated calls give fresh sets.
+        if stream is not None:
+            if stream < 0:
+                raise ValueError("stream must be a non-negative integer")
+            return stream
+        if num_shards != 1:
+            return 0
+        with self._stream_lock:
+            stream = self._stream
+            self._stream += 1
+        return stream
+    
+    def allocate_questions(self, num_questions: int,
+                           categories: List[str] = None,
+                           complexity_override: Dict[str, float] = None,
+                           stream: int = 0) -> List[QuestionCell]:
         
         if categories is None:
             categories = list(self.categories.keys())
+        if not categories:
+            raise ValueError("At least one category is required")
         
-        questions = []
-        questions_per_category = max(1, num_questions // len(categories))
+        with self._stage("allocate"):
+            return self._allocate_questions(num_questions, categories, complexity_override, stream)
+    
+    def _allocate_questions(self, num_questions: int, categories: List[str],
+                            complexity_override: Optional[Dict[str, float]], stream: int = 0) -> List[QuestionCell]:
+        cells = []
+        # Remainder ties are broken in a seeded order, so the seed and stream vary which
+        # categories, complexities and personas get the leftover questions of a small set.
+        rng = self._allocation_rng(stream)
+        persona_weights = [self.persona_weights.get(persona, 1.0) for persona in self.user_personas]
+        persona_carry = [0.0] * len(self.user_personas)
+        # Complexity remainders carry across categories too, so small sets keep the overall mix
+        # instead of rounding every category towards its most common complexity.
+        complexity_carry: Dict[str, float] = {}
+        category_counts = _apportion(max(0, num_questions),
+                                     [self.category_weights.get(category, 1.0) for category in categories],
+                                     order=_shuffled(len(categories), rng))
         
-        for category in categories:
+        for category, category_count in zip(categories, category_counts):
             category_info = self.categories[category]
             complexity_dist = complexity_override.get(category, category_info["complexity_distribution"]) if complexity_override else category_info["complexity_distribution"]
+            carry = [complexity_carry.get(complexity, 0.0) for complexity in complexity_dist]
+            complexity_counts = _apportion(category_count, list(complexity_dist.values()), carry,
+                                           _shuffled(len(complexity_dist), rng))
+            complexity_carry.update(zip(complexity_dist, carry))
             
-            for _ in range(questions_per_category):
-                complexity = self._select_complexity(complexity_dist)
-                subcategory = random.choice(category_info["subcategories"])
-                question = self._generate_question_for_category(category, complexity, subcategory)
-                persona = random.choice(self.user_personas)
-                
-                test_q = TestQuestion(
-                    id=f"Q{len(questions)+1:03d}",
-                    question=question,
-                    category=category,
-                    subcategory=subcategory,
-                    complexity=complexity,
-                    priority=self._get_priority(complexity),
-                    user_persona=persona,
-                    state=self.state
-                )
-                
-                questions.append(test_q)
+            for complexity, complexity_count in zip(complexity_dist, complexity_counts):
+                cell_weights = persona_weights
+                if self.persona_affinity:
+                    # Personas are split per cell, so a zero affinity never produces the pairing at all.
+                    cell_weights = [weight * affinity for weight, affinity in
+                                    zip(persona_weights, self.persona_affinity.weights(category, complexity))]
+                    if complexity_count and not sum(cell_weights):
+                        raise ValueError(f"No persona has a non-zero affinity for {category}/{complexity}")
+                persona_counts = _apportion(complexity_count, cell_weights, persona_carry,
+                                            _shuffled(len(self.user_personas), rng))
+                for persona, count in zip(self.user_personas, persona_counts):
+                    if count:
+                        cells.append(QuestionCell(category, complexity, persona, count))
         
-        while len(questions) < num_questions:
-            category = random.choice(categories)
-            category_info = self.categories[category]
-            complexity_dist = category_info["complexity_distribution"]
-            complexity = self._select_complexity(complexity_dist)
-            subcategory = random.choice(category_info["subcategories"])
-            
-            question = self._generate_question_for_category(category, complexity, subcategory)
-            persona = random.choice(self.user_personas)
+        return cells
+    
+    def _allocation_rng(self, stream: int = 0) -> random.Random:
+        return random.Random(f"allocate:{self.seed}:{stream}")
+    
+    def iter_question_delta(self, num_questions: int,
+                            existing_counts: Mapping[Tuple[str, str, str], int],
+                            categories: List[str] = None,
+                            complexity_override: Dict[str, float] = None,
+                            unique: bool = False,
+                            existing_questions: Iterable[str] = ()) -> Iterator[TestQuestion]:
+        
+        if categories is None:
+            categories = list(self.categories.keys())
+        
+        existing_total = sum(existing_counts.values())
+        cells = self.allocate_delta(num_questions, existing_counts, categories, complexity_override)
+        stop = existing_total + sum(cell.count for cell in cells)
+        
+        unique_pool = None
+        if unique:
+            unique_pool = _UniqueQuestionPool(self, categories)
+            unique_pool.seen.update(existing_questions)
+            unique_pool.check_capacity(stop - existing_total)
+        
+        # The delta continues the seeded stream and the ID sequence where the existing set ends.
+        return self._iter_questions(cells, existing_total, stop, unique_pool, first_position=existing_total)
+    
+    def allocate_delta(self, num_questions: int,
+                       existing_counts: Mapping[Tuple[str, str, str], int],
+                       categories: List[str] = None,
+                       complexity_override: Dict[str, float] = None,
+                       stream: int = 0) -> List[QuestionCell]:
+        
+        delta = max(0, num_questions - sum(existing_counts.values()))
+        target = self.allocate_questions(num_questions, categories, complexity_override, stream)
+        deficits = [
+            max(0, cell.count - existing_counts.get((cell.category, cell.complexity, cell.user_persona), 0))
+            for cell in target
+        ]
+        weights = deficits if any(deficits) else [cell.count for cell in target]
+        
+        return [
+            QuestionCell(cell.category, cell.complexity, cell.user_persona, count)
+            for cell, count in zip(target, _apportion(delta, weights, order=_shuffled(len(target), self._allocation_rng(stream))))
+            if count
+        ]
+    
+    def generate_covering_set(self, num_questions: Optional[int] = None,
+                              categories: List[str] = None,
+                              complexity_override: Dict[str, float] = None) -> List[TestQuestion]:
+        with self._stage("generate") as stage:
+            questions = list(self.iter_covering_set(num_questions, categories, complexity_override))
+            stage.count = len(questions)
+        return questions
+    
+    def iter_covering_set(self, num_questions: Optional[int] = None,
+                          categories: List[str] = None,
+                          complexity_override: Dict[str, float] = None) -> Iterator[TestQuestion]:
+        from question_coverage import CoverageSpace
+        
+        if categories is None:
+            categories = list(self.categories.keys())
+        if not categories:
+            raise ValueError("At least one category is required")
+        
+        with self._stage("coverage_space") as stage:
+            space = CoverageSpace(self, categories, complexity_override)
+            stage.count = len(space)
+        if not space:
+            raise ValueError(f"No reachable coverage cells for {', '.join(categories)}")
+        if num_questions is None:
+            num_questions = len(space)
+        return self._iter_covering_set(space, max(0, num_questions), categories, complexity_override, self._next_stream())
+    
+    def _iter_covering_set(self, space: "CoverageSpace", num_questions: int, categories: List[str],
+                           complexity_override: Optional[Dict[str, float]], stream: int) -> Iterator[TestQuestion]:
+        cover = min(num_questions, len(space))
+        format_id = self.id_scheme.bind(self.state, self.seed, num_questions)
+        order = list(range(len(space)))
+        covered_counts = Counter()
+        
+        for position, (shuffle_draw, _, variation_draw) in zip(range(cover), self._iter_draws(0, cover, stream)):
+            # A partial Fisher-Yates shuffle: one question per cell, and a budget below the cover
+            # size takes a uniform sample of the cells.
+            pick = position + int(shuffle_draw * (len(order) - position))
+            order[position], order[pick] = order[pick], order[position]
+            category, subcategory, complexity, persona, template = space.cells[order[position]]
+            if template < 0:
+                question = self._fallback_question(subcategory)
+            else:
+                question = self._render_template(self._index.template_slices[category][complexity], template, variation_draw)
+            covered_counts[(category, complexity, persona)] += 1
             
-            test_q = TestQuestion(
-                id=f"Q{len(questions)+1:03d}",
+            yield TestQuestion(
+                id=format_id(position, question),
                 question=question,
                 category=category,
                 subcategory=subcategory,
@@ -876,64 +590,435 @@ class SimpleQuestionGenerator:
                 user_persona=persona,
                 state=self.state
             )
+        
+        if num_questions > cover:
+            # The rest of the budget tops each cell up towards the configured mix, so the covering
+            # set's uniform spread is evened out rather than added to.
+            cells = self.allocate_delta(num_questions, covered_counts, categories, complexity_override, stream)
+            yield from self._iter_questions(cells, cover, num_questions, None, first_position=cover, stream=stream)
+    
+    def _iter_questions(self, cells: List[QuestionCell], start: int, stop: int,
+                        unique_pool: Optional["_UniqueQuestionPool"],
+                        first_position: int = 0, stream: int = 0) -> Iterator[TestQuestion]:
+        draws = self._iter_draws(start, stop, stream)
+        format_id = self.id_scheme.bind(self.state, self.seed, first_position + sum(cell.count for cell in cells))
+        cell_start = first_position
+        
+        for cell in cells:
+            cell_stop = cell_start + cell.count
+            if cell_start >= stop:
+                break
+            if cell_stop <= start:
+                cell_start = cell_stop
+                continue
             
-            questions.append(test_q)
-        
-        return questions[:num_questions]
-    
-    def _select_complexity(self, distribution: Dict[str, float]) -> str:
-        rand = random.random()
-        cumulative = 0
-        for complexity, prob in distribution.items():
-            cumulative += prob
-            if rand <= cumulative:
-                return complexity
-        return "basic"
-    
-    def _generate_question_for_category(self, category: str, complexity: str, subcategory: str) -> str:
-        templates = self.question_templates.get(category, {}).get(complexity, [])
-        
-        if templates:
-            base_question = random.choice(templates)
-            variations = self._get_question_variations(base_question, subcategory)
-            return random.choice(variations)
-        else:
-            return f"What services does {self.state_name} provide for {subcategory.replace('_', ' ')}?"
+            subcategories = self.categories[cell.category]["subcategories"]
+            subcategory_alias = self._index.subcategory_aliases[cell.category]
+            for position in range(max(start, cell_start), min(stop, cell_stop)):
+                subcategory_draw, template_draw, variation_draw = next(draws)
+                
+                if unique_pool is None:
+                    category = cell.category
+                    complexity = cell.complexity
+                    subcategory = subcategories[subcategory_alias.index(subcategory_draw)]
+                    question = self._generate_question_for_category(category, complexity, subcategory, template_draw, variation_draw)
+                else:
+                    question, category, complexity, subcategory = unique_pool.take_any(
+                        cell.category, cell.complexity, subcategory_draw, template_draw
+                    )
+                
+                yield TestQuestion(
+                    id=format_id(position, question),
+                    question=question,
+                    category=category,
+                    subcategory=subcategory,
+                    complexity=complexity,
+                    priority=self._get_priority(complexity),
+                    user_persona=cell.user_persona,
+                    state=self.state
+                )
+            
+            cell_start = cell_stop
     
-    def _get_question_variations(self, base_question: str, subcategory: str) -> List[str]:
-        variations = [base_question]
+    def _iter_draws(self, start: int, stop: int, stream: int = 0) -> Iterator[Tuple[float, ...]]:
+        block, offset = divmod(start, _RNG_BLOCK_SIZE)
+        position = start
+        while position < stop:
+            rand = random.Random(self._block_seed(block, stream)).random
+            for _ in range(offset * _DRAWS_PER_QUESTION):
+                rand()
+            
+            block_stop = min(stop, (block + 1) * _RNG_BLOCK_SIZE)
+            for _ in range(position, block_stop):
+                yield rand(), rand(), rand()
+            
+            position = block_stop
+            block += 1
+            offset = 0
+    
+    def _block_seed(self, block: int, stream: int = 0) -> int:
+        block_seed = ((self.seed + 1) << 32) | block
+        # Stream 0 keeps the original layout, so seeded sets replay unchanged.
+        return (block_seed << 32) | stream if stream else block_seed
+    
+    def generate_batch(self, num_questions: int = 50,
+                       categories: List[str] = None,
+                       complexity_override: Dict[str, float] = None,
+                       engine: str = "python",
+                       shard: int = 0,
+                       num_shards: int = 1,
+                       unique: bool = False,
+                       stream: Optional[int] = None) -> "QuestionBatch":
         
-        if "How do I" in base_question:
-            variations.append(base_question.replace("How do I", "What's the process to"))
-            variations.append(base_question.replace("How do I", "Can you help me"))
+        if categories is None:
+            categories = list(self.categories.keys())
         
-        if "What are" in base_question:
-            variations.append(base_question.replace("What are", "Can you tell me about"))
-            variations.append(base_question.replace("What are", "I need information about"))
+        stream = self._next_stream(num_shards, stream)
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.key(self._result_params(
+                num_questions, categories, complexity_override, shard, num_shards, unique, stream
+            ))
+            with self._stage("cache_lookup"):
+                columns = self.result_cache.load_batch(cache_key)
+            if columns is not None:
+                id_format = None if columns["ids"] is not None else self.id_scheme.bind(self.state, self.seed, max(0, num_questions))
+                return QuestionBatch(**columns, id_format=id_format)
         
-        return variations
+        if unique:
+            if engine != "python":
+                raise ValueError("unique sampling is only supported by the python engine")
+            batch = QuestionBatch.from_questions(
+                self.iter_questions(num_questions, categories, complexity_override, shard, num_shards, unique, stream)
+            )
+        else:
+            start, stop = _shard_bounds(num_questions, shard, num_shards)
+            cells = self.allocate_questions(num_questions, categories, complexity_override, stream)
+            batch = self._sample_batch(cells, categories, start, stop, engine, stream)
+        
+        if cache_key is not None:
+            with self._stage("cache_store"):
+                self.result_cache.store_batch(cache_key, batch)
+        return batch
     
-    def _get_priority(self, complexity: str) -> str:
-        priority_map = {
-            "basic": "high",
-            "intermediate": "medium",
-            "complex": "low"
+    def _result_params(self, num_questions: int, categories: List[str],
+                       complexity_override: Optional[Dict[str, float]],
+                       shard: int, num_shards: int, unique: bool, stream: int) -> Dict[str, Any]:
+        # The engine is left out: both engines replay the same seeded stream.
+        return {
+            "state": self.state,
+            "state_name": self.state_name,
+            "seed": self.seed,
+            "count": num_questions,
+            "categories": categories,
+            "complexity_override": complexity_override,
+            "shard": shard,
+            "num_shards": num_shards,
+            "unique": unique,
+            "stream": stream,
+            "category_weights": self.category_weights,
+            "persona_weights": self.persona_weights,
+            "persona_affinity": self.persona_affinity.matrix if self.persona_affinity else None,
+            "id_scheme": [type(self.id_scheme).__name__, vars(self.id_scheme)]
         }
-        return priority_map.get(complexity, "medium")
     
-    def save_questions(self, questions: List[TestQuestion], filename: str = None) -> str:
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"simple_questions_{timestamp}.json"
+    def generate_many(self, counts: List[int],
+                      categories: List[str] = None,
+                      complexity_override: Dict[str, float] = None,
+                      engine: str = "python") -> List[List[TestQuestion]]:
+        
+        if categories is None:
+            categories = list(self.categories.keys())
+        
+        # Each request keeps its own allocation; their cells are concatenated so
+        # a single sampling pass serves all of them.
+        stream = self._next_stream()
+        cells = []
+        for count in counts:
+            cells.extend(self.allocate_questions(count, categories, complexity_override, stream))
+        total = sum(cell.count for cell in cells)
+        
+        if engine == "python":
+            questions = self._iter_questions(cells, 0, total, None, stream=stream)
+        else:
+            questions = iter(self._sample_batch(cells, categories, 0, total, engine, stream))
+        
+        results = []
+        for request, count in enumerate(counts):
+            chunk = list(islice(questions, max(0, count)))
+            # Requests share the pass's seed, so each is bound as its own run.
+            format_id = self.id_scheme.bind(self.state, f"{self.seed}.{request}", len(chunk))
+            for position, question in enumerate(chunk):
+                question.id = format_id(position, question.question)
+            results.append(chunk)
+        return results
+    
+    def _sample_batch(self, cells: List[QuestionCell], categories: List[str],
+                      start: int, stop: int, engine: str, stream: int = 0) -> "QuestionBatch":
+        with self._stage("cell_tables"):
+            tables = _CellTables(self, cells, categories)
         
-        questions_data = [asdict(q) for q in questions]
+        with self._stage("sample") as stage:
+            if engine == "numpy":
+                columns = self._sample_columns_numpy(tables, cells, start, stop, stream)
+            elif engine == "python":
+                columns = self._sample_columns_python(tables, cells, start, stop, stream)
+            else:
+                raise ValueError(f"Unknown generation engine: {engine}")
+            stage.count = max(0, stop - start)
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(questions_data, f, indent=2, ensure_ascii=False)
+        category_codes, subcategory_codes, complexity_codes, persona_codes, question_codes = columns
+        return QuestionBatch(
+            states=[self.state],
+            categories=tables.categories,
+            subcategories=tables.subcategories,
+            complexities=tables.complexities,
+            personas=tables.personas,
+            questions=tables.questions,
+            state_codes=_code_array(1, [0] * len(question_codes)),
+            category_codes=category_codes,
+            subcategory_codes=subcategory_codes,
+            complexity_codes=complexity_codes,
+            persona_codes=persona_codes,
+            question_codes=question_codes,
+            first_id=start + 1,
+            id_format=self.id_scheme.bind(self.state, self.seed, sum(cell.count for cell in cells))
+        )
+    
+    def _sample_columns_python(self, tables: "_CellTables", cells: List[QuestionCell],
+                               start: int, stop: int, stream: int) -> Tuple[array, ...]:
+        category_codes = []
+        complexity_codes = []
+        persona_codes = []
+        subcategory_codes = []
+        question_codes = []
+        
+        draws = self._iter_draws(start, stop, stream)
+        subcategory_table = tables.subcategory_table
+        subcategory_probabilities = tables.subcategory_probabilities
+        subcategory_aliases = tables.subcategory_aliases
+        flat_starts = tables.flat_starts
+        flat_probabilities = tables.flat_probabilities
+        flat_aliases = tables.flat_aliases
+        flat_totals = tables.flat_totals
+        flat_sizes = tables.flat_sizes
+        cell_start = 0
+        
+        for cell_code, cell in enumerate(cells):
+            cell_stop = cell_start + cell.count
+            if cell_start >= stop:
+                break
+            if cell_stop <= start:
+                cell_start = cell_stop
+                continue
+            
+            size = min(stop, cell_stop) - max(start, cell_start)
+            category_codes.extend([tables.cell_categories[cell_code]] * size)
+            complexity_codes.extend([tables.cell_complexities[cell_code]] * size)
+            persona_codes.extend([tables.cell_personas[cell_code]] * size)
+            
+            subcategory_offset = tables.cell_subcategory_offsets[cell_code]
+            subcategory_count = tables.cell_subcategory_counts[cell_code]
+            template_offset = tables.cell_template_offsets[cell_code]
+            template_count = tables.cell_template_counts[cell_code]
+            for _ in range(size):
+                subcategory_draw, template_draw, variation_draw = next(draws)
+                scaled = subcategory_draw * subcategory_count
+                subcategory = subcategory_offset + int(scaled)
+                if scaled - int(scaled) >= subcategory_probabilities[subcategory]:
+                    subcategory = subcategory_offset + subcategory_aliases[subcategory]
+                subcategory_code = subcategory_table[subcategory]
+                subcategory_codes.append(subcategory_code)
+                if template_count:
+                    scaled = template_draw * template_count
+                    template = template_offset + int(scaled)
+                    if scaled - int(scaled) >= flat_probabilities[template]:
+                        template = template_offset + flat_aliases[template]
+                    variation = int(variation_draw * flat_totals[template])
+                    size = flat_sizes[template]
+                    if size == 1:
+                        question_codes.append(flat_starts[template] + variation)
+                    else:
+                        variation, combination = divmod(variation, size)
+                        question_codes.append(tables.slot_code(flat_starts[template] + variation, combination))
+                else:
+                    question_codes.append(tables.fallback_code(subcategory_code))
+            
+            cell_start = cell_stop
+        
+        return (
+            _code_array(len(tables.categories), category_codes),
+            _code_array(len(tables.subcategories), subcategory_codes),
+            _code_array(len(tables.complexities), complexity_codes),
+            _code_array(len(tables.personas), persona_codes),
+            _code_array(len(tables.questions), question_codes)
+        )
+    
+    def _sample_columns_numpy(self, tables: "_CellTables", cells: List[QuestionCell],
+                              start: int, stop: int, stream: int) -> Tuple[array, ...]:
+        np = _import_numpy()
+        draws = self._block_draws_numpy(np, start, stop, stream)
+        
+        cell_ends = np.cumsum(np.fromiter((cell.count for cell in cells), dtype=np.int64, count=len(cells)))
+        cell_codes = np.searchsorted(cell_ends, np.arange(start, stop), side="right")
         
+        subcategory_codes = np.asarray(tables.subcategory_table, dtype=np.intp)[_alias_draws_numpy(
+            np, draws[:, 0],
+            np.asarray(tables.cell_subcategory_counts, dtype=np.intp)[cell_codes],
+            np.asarray(tables.cell_subcategory_offsets, dtype=np.intp)[cell_codes],
+            tables.subcategory_probabilities, tables.subcategory_aliases
+        )]
+        
+        template_counts = np.asarray(tables.cell_template_counts, dtype=np.intp)[cell_codes]
+        has_templates = template_counts > 0
+        templates = np.where(
+            has_templates,
+            _alias_draws_numpy(
+                np, draws[:, 1], template_counts,
+                np.asarray(tables.cell_template_offsets, dtype=np.intp)[cell_codes],
+                tables.flat_probabilities, tables.flat_aliases
+            ),
+            len(tables.flat_starts) - 1
+        )
+        flat_starts = np.asarray(tables.flat_starts, dtype=np.intp)
+        flat_totals = np.asarray(tables.flat_totals, dtype=np.intp)
+        variations = (draws[:, 2] * flat_totals[templates]).astype(np.intp)
+        if tables.has_slots:
+            sizes = np.asarray(tables.flat_sizes, dtype=np.intp)[templates]
+            slotted = sizes > 1
+            variations[slotted], combinations = np.divmod(variations[slotted], sizes[slotted])
+        question_codes = flat_starts[templates] + variations
+        if tables.has_slots and slotted.any():
+            # Only the combinations actually drawn are rendered and added to the vocabulary.
+            question_codes[slotted] = [
+                tables.slot_code(pool_index, combination)
+                for pool_index, combination in zip(question_codes[slotted].tolist(), combinations.tolist())
+            ]
+        
+        if not has_templates.all():
+            fallback_subcategories = subcategory_codes[~has_templates]
+            fallback_codes = np.zeros(len(tables.subcategories), dtype=np.intp)
+            for subcategory_code in np.unique(fallback_subcategories).tolist():
+                fallback_codes[subcategory_code] = tables.fallback_code(subcategory_code)
+            question_codes[~has_templates] = fallback_codes[fallback_subcategories]
+        
+        return (
+            _code_array(len(tables.categories), np.asarray(tables.cell_categories, dtype=np.intp)[cell_codes], np),
+            _code_array(len(tables.subcategories), subcategory_codes, np),
+            _code_array(len(tables.complexities), np.asarray(tables.cell_complexities, dtype=np.intp)[cell_codes], np),
+            _code_array(len(tables.personas), np.asarray(tables.cell_personas, dtype=np.intp)[cell_codes], np),
+            _code_array(len(tables.questions), question_codes, np)
+        )
+    
+    def _block_draws_numpy(self, np, start: int, stop: int, stream: int = 0):
+        chunks = []
+        block, offset = divmod(start, _RNG_BLOCK_SIZE)
+        position = start
+        while position < stop:
+            block_stop = min(stop, (block + 1) * _RNG_BLOCK_SIZE)
+            # RandomState seeded with the same 32-bit key words as random.Random(int)
+            # replays the python engine's Mersenne Twister stream exactly.
+            block_rng = np.random.RandomState(np.asarray(_seed_key_words(self._block_seed(block, stream)), dtype=np.int64))
+            draws = block_rng.random_sample((offset + block_stop - position) * _DRAWS_PER_QUESTION)
+            chunks.append(draws[offset * _DRAWS_PER_QUESTION:])
+            
+            position = block_stop
+            block += 1
+            offset = 0
+        
+        if not chunks:
+            return np.empty((0, _DRAWS_PER_QUESTION))
+        return np.concatenate(chunks).reshape(-1, _DRAWS_PER_QUESTION)
+    
+    def _select_complexity(self, distribution: Dict[str, float], rand: float = None) -> str:
+        if rand is None:
+            rand = self._rng.random()
+        complexities, alias = _distribution_alias(tuple(distribution.items()))
+        return complexities[alias.index(rand)]
+    
+    def _generate_question_for_category(self, category: str, complexity: str, subcategory: str,
+                                        template_draw: float = None, variation_draw: float = None) -> str:
+        template_slice = self._index.template_slices.get(category, {}).get(complexity)
+        
+        if template_slice:
+            if template_draw is None:
+                template_draw = self._rng.random()
+            if variation_draw is None:
+                variation_draw = self._rng.random()
+            return self._render_template(template_slice, template_slice.alias.index(template_draw), variation_draw)
+        else:
+            return self._fallback_question(subcategory)
+    
+    def _render_template(self, template_slice: TemplateSlice, template: int, variation_draw: float) -> str:
+        size = template_slice.sizes[template]
+        variation = int(variation_draw * (template_slice.counts[template] * size))
+        if size == 1:
+            return self._index.question_pool[template_slice.starts[template] + variation]
+        variation, combination = divmod(variation, size)
+        return self._index.slot_templates[template_slice.starts[template] + variation].render(combination)
+    
+    def _fallback_question(self, subcategory: str) -> str:
+        label = self._index.subcategory_labels.get(subcategory) or subcategory.replace('_', ' ')
+        return f"What services does {self.state_name} provide for {label}?"
+    
+    def _get_question_variations(self, base_question: str, subcategory: str) -> List[str]:
+        return list(self._index.paraphrases.variants(base_question))
+    
+    def _get_priority(self, complexity: str) -> str:
+        return PRIORITY_BY_COMPLEXITY.get(complexity, "medium")
+    
+    def save_questions(self, questions: Union[Iterable[TestQuestion], "QuestionBatch"], filename: str = None,
+                       format: str = "json", compress: Optional[str] = None) -> str:
+        from question_formats import output_extension, write_questions
+        
+        if filename is None:
+            timestamp = time.strftime('%Y%m%d_%H%M%S')
+            filename = f"simple_questions_{timestamp}{output_extension(format, compress)}"
+        
+        with self._stage("write") as stage:
+            stage.count = write_questions(questions, filename, format, compress)
         return filename
     
-    def generate_focused_test_set(self, focus_area: str, num_questions: int = 20) -> List[TestQuestion]:
+    def generate_focused_test_set(self, focus_area: str, num_questions: int = 20,
+                                  engine: str = "python", shard: int = 0,
+                                  num_shards: int = 1, unique: bool = False) -> List[TestQuestion]:
+        categories, complexity_override = self._get_focus_config(focus_area)
+        
+        return self.generate_questions(
+            num_questions=num_questions,
+            categories=categories,
+            complexity_override=complexity_override,
+            engine=engine,
+            shard=shard,
+            num_shards=num_shards,
+            unique=unique
+        )
+    
+    def generate_focused_batch(self, focus_area: str, num_questions: int = 20,
+                               engine: str = "python", shard: int = 0,
+                               num_shards: int = 1, unique: bool = False) -> "QuestionBatch":
+        categories, complexity_override = self._get_focus_config(focus_area)
+        return self.generate_batch(num_questions, categories, complexity_override, engine, shard, num_shards, unique)
+    
+    def iter_focused_test_set(self, focus_area: str, num_questions: int = 20,
+                              shard: int = 0, num_shards: int = 1,
+                              unique: bool = False) -> Iterator[TestQuestion]:
+        categories, complexity_override = self._get_focus_config(focus_area)
+        return self.iter_questions(num_questions, categories, complexity_override, shard, num_shards, unique)
+    
+    def iter_focused_covering_set(self, focus_area: str, num_questions: Optional[int] = None) -> Iterator[TestQuestion]:
+        categories, complexity_override = self._get_focus_config(focus_area)
+        return self.iter_covering_set(num_questions, categories, complexity_override)
+    
+    def iter_focused_delta(self, focus_area: str, num_questions: int,
+                           existing_counts: Mapping[Tuple[str, str, str], int],
+                           unique: bool = False,
+                           existing_questions: Iterable[str] = ()) -> Iterator[TestQuestion]:
+        categories, complexity_override = self._get_focus_config(focus_area)
+        return self.iter_question_delta(num_questions, existing_counts, categories, complexity_override,
+                                        unique, existing_questions)
+    
+    def _get_focus_config(self, focus_area: str) -> Tuple[List[str], Dict[str, Any]]:
         focus_configs = {
             "basic_services": {
                 "categories": ["government", "transportation", "recreation"],
@@ -949,11 +1034,752 @@ class SimpleQuestionGenerator:
         categories = config.get("categories", list(self.categories.keys())[:4])
         complexity_override = config.get("complexity_override", {})
         
-        return self.generate_questions(
-            num_questions=num_questions,
-            categories=categories,
-            complexity_override=complexity_override
+        return categories, complexity_override
+
+def question_to_dict(question: TestQuestion) -> Dict[str, str]:
+    return {
+        'id': question.id,
+        'question': question.question,
+        'category': question.category,
+        'subcategory': question.subcategory,
+        'complexity': question.complexity,
+        'priority': question.priority,
+        'user_persona': question.user_persona,
+        'state': question.state
+    }
+
+def write_questions_jsonl(questions: Iterable[TestQuestion], file: Union[str, TextIO],
+                          compress: Optional[str] = None) -> int:
+    if isinstance(file, str):
+        from question_formats import write_questions
+        if compress is None and file.endswith(".gz"):
+            compress = "gzip"
+        elif compress is None and file.endswith(".zst"):
+            compress = "zstd"
+        return write_questions(questions, file, "jsonl", compress)
+    
+    from question_formats import CHUNK_SIZE, encode_questions_jsonl
+    written = 0
+    iterator = iter(questions)
+    while True:
+        chunk = list(islice(iterator, CHUNK_SIZE))
+        if not chunk:
+            break
+        file.write(encode_questions_jsonl(chunk).decode("utf-8"))
+        written += len(chunk)
+    return written
+
+def _shard_bounds(num_questions: int, shard: int, num_shards: int) -> Tuple[int, int]:
+    if num_shards < 1:
+        raise ValueError("num_shards must be at least 1")
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"shard must be in range [0, {num_shards})")
+    num_questions = max(0, num_questions)
+    return shard * num_questions // num_shards, (shard + 1) * num_questions // num_shards
+
+def _apportion(total: int, weights: List[float], carry: List[float] = None,
+               order: List[int] = None) -> List[int]:
+    if any(weight < 0 for weight in weights):
+        raise ValueError("Distribution weights must be non-negative")
+    weight_sum = sum(weights)
+    if not weight_sum:
+        if total:
+            raise ValueError("Distribution weights must not all be zero")
+        return [0] * len(weights)
+    
+    quotas = [total * weight / weight_sum for weight in weights]
+    counts = [int(quota) for quota in quotas]
+    scores = [quota - count for quota, count in zip(quotas, counts)]
+    if carry is not None:
+        scores = [score + owed for score, owed in zip(scores, carry)]
+    
+    # Leftover seats only go to positive weights, however much a zero-weight entry is owed.
+    # Scores are rounded so that ties left by float noise still fall to the given order.
+    candidates = range(len(weights)) if order is None else order
+    for i in sorted((i for i in candidates if weights[i]), key=lambda i: -round(scores[i], 9))[:total - sum(counts)]:
+        counts[i] += 1
+    
+    if carry is not None:
+        for i, (quota, count) in enumerate(zip(quotas, counts)):
+            carry[i] += quota - count
+    return counts
+
+def _shuffled(size: int, rng: random.Random) -> List[int]:
+    order = list(range(size))
+    rng.shuffle(order)
+    return order
+
+def _check_weights(weights: Iterable[float], what: str = "weights") -> List[float]:
+    weights = [float(weight) for weight in weights]
+    if not weights:
+        raise ValueError(f"{what}: at least one weight is required")
+    if any(not math.isfinite(weight) or weight < 0 for weight in weights):
+        raise ValueError(f"{what}: weights must be finite and non-negative")
+    if not sum(weights):
+        raise ValueError(f"{what}: weights must not all be zero")
+    return weights
+
+def _weight_mapping(weights: Optional[Mapping[str, float]], names: Iterable[str], what: str) -> Dict[str, float]:
+    if not weights:
+        return {}
+    unknown = set(weights) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown {what} in weights: {', '.join(sorted(unknown))}")
+    for name, weight in weights.items():
+        if not math.isfinite(weight) or weight < 0:
+            raise ValueError(f"{what} weight for {name} must be finite and non-negative")
+    return dict(weights)
+
+def _affinity_weight(weight: Any, what: str) -> float:
+    try:
+        weight = float(weight)
+    except (TypeError, ValueError):
+        raise ValueError(f"Affinity for {what} must be a number") from None
+    if not math.isfinite(weight) or weight < 0:
+        raise ValueError(f"Affinity for {what} must be finite and non-negative")
+    return weight
+
+@lru_cache(maxsize=256)
+def _distribution_alias(items: Tuple[Tuple[str, float], ...]) -> Tuple[Tuple[str, ...], AliasTable]:
+    return tuple(name for name, _ in items), AliasTable([weight for _, weight in items], "complexity distribution")
+
+def _alias_draws_numpy(np, draws, counts, offsets, probabilities: List[float], aliases: List[int]):
+    scaled = draws * counts
+    picks = scaled.astype(np.intp)
+    columns = offsets + picks
+    return offsets + np.where(
+        scaled - picks < np.asarray(probabilities, dtype=np.float64)[columns],
+        picks,
+        np.asarray(aliases, dtype=np.intp)[columns]
+    )
+
+def _seed_key_words(seed: int) -> List[int]:
+    words = []
+    while seed:
+        words.append(seed & 0xFFFFFFFF)
+        seed >>= 32
+    return words or [0]
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError("The numpy engine requires NumPy: pip install numpy") from exc
+    return numpy
+
+class QuestionBatch:
+    __slots__ = (
+        "states", "categories", "subcategories", "complexities", "personas", "questions",
+        "state_codes", "category_codes", "subcategory_codes", "complexity_codes",
+        "persona_codes", "question_codes", "first_id", "ids", "id_format"
+    )
+    
+    _COLUMNS = {
+        "state": ("states", "state_codes"),
+        "category": ("categories", "category_codes"),
+        "subcategory": ("subcategories", "subcategory_codes"),
+        "complexity": ("complexities", "complexity_codes"),
+        "user_persona": ("personas", "persona_codes"),
+        "question": ("questions", "question_codes")
+    }
+    
+    def __init__(self, states: List[str], categories: List[str], subcategories: List[str],
+                 complexities: List[str], personas: List[str], questions: List[str],
+                 state_codes: array, category_codes: array, subcategory_codes: array,
+                 complexity_codes: array, persona_codes: array, question_codes: array,
+                 first_id: int = 1, ids: Optional[List[str]] = None,
+                 id_format: Optional[Callable[[int, str], str]] = None):
+        self.states = states
+        self.categories = categories
+        self.subcategories = subcategories
+        self.complexities = complexities
+        self.personas = personas
+        self.questions = questions
+        self.state_codes = state_codes
+        self.category_codes = category_codes
+        self.subcategory_codes = subcategory_codes
+        self.complexity_codes = complexity_codes
+        self.persona_codes = persona_codes
+        self.question_codes = question_codes
+        self.first_id = first_id
+        self.ids = ids
+        self.id_format = id_format or SequentialIds().bind(states[0] if states else "", None, first_id - 1 + len(question_codes))
+    
+    @classmethod
+    def from_questions(cls, questions: Iterable[TestQuestion]) -> "QuestionBatch":
+        vocabularies = {column: {} for column in cls._COLUMNS}
+        codes = {column: [] for column in cls._COLUMNS}
+        ids = []
+        for question in questions:
+            ids.append(question.id)
+            for column in cls._COLUMNS:
+                vocabulary = vocabularies[column]
+                value = getattr(question, column)
+                code = vocabulary.get(value)
+                if code is None:
+                    code = vocabulary[value] = len(vocabulary)
+                codes[column].append(code)
+        
+        columns = {}
+        for column, (vocabulary_name, codes_name) in cls._COLUMNS.items():
+            columns[vocabulary_name] = list(vocabularies[column])
+            columns[codes_name] = _code_array(len(vocabularies[column]), codes[column])
+        return cls(ids=ids, **columns)
+    
+    def __len__(self) -> int:
+        return len(self.question_codes)
+    
+    def question_id(self, position: int) -> str:
+        if self.ids is not None:
+            return self.ids[position]
+        return self.id_format(self.first_id - 1 + position, self.questions[self.question_codes[position]])
+    
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("QuestionBatch index out of range")
+        
+        complexity = self.complexities[self.complexity_codes[position]]
+        return TestQuestion(
+            id=self.question_id(position),
+            question=self.questions[self.question_codes[position]],
+            category=self.categories[self.category_codes[position]],
+            subcategory=self.subcategories[self.subcategory_codes[position]],
+            complexity=complexity,
+            priority=PRIORITY_BY_COMPLEXITY.get(complexity, "medium"),
+            user_persona=self.personas[self.persona_codes[position]],
+            state=self.states[self.state_codes[position]]
+        )
+    
+    def __iter__(self) -> Iterator[TestQuestion]:
+        states = self.states
+        categories = self.categories
+        subcategories = self.subcategories
+        complexities = self.complexities
+        personas = self.personas
+        questions = self.questions
+        priorities = [PRIORITY_BY_COMPLEXITY.get(complexity, "medium") for complexity in complexities]
+        ids = self.ids
+        if ids is None:
+            id_format = self.id_format
+            ids = (
+                id_format(position, questions[question])
+                for position, question in enumerate(self.question_codes, self.first_id - 1)
+            )
+        
+        for question_id, state, category, subcategory, complexity, persona, question in zip(
+                ids, self.state_codes, self.category_codes, self.subcategory_codes,
+                self.complexity_codes, self.persona_codes, self.question_codes):
+            yield TestQuestion(
+                id=question_id,
+                question=questions[question],
+                category=categories[category],
+                subcategory=subcategories[subcategory],
+                complexity=complexities[complexity],
+                priority=priorities[complexity],
+                user_persona=personas[persona],
+                state=states[state]
+            )
+    
+    def value_counts(self, column: str) -> Dict[str, int]:
+        vocabulary_name, codes_name = self._COLUMNS[column]
+        vocabulary = getattr(self, vocabulary_name)
+        codes = getattr(self, codes_name)
+        
+        try:
+            import numpy as np
+        except ImportError:
+            counts = Counter(codes)
+            return {vocabulary[code]: counts[code] for code in sorted(counts)}
+        
+        counts = np.bincount(np.frombuffer(codes, dtype=_NUMPY_DTYPES[codes.typecode]), minlength=len(vocabulary))
+        return {vocabulary[code]: int(count) for code, count in enumerate(counts.tolist()) if count}
+    
+    def category_counts(self) -> Dict[str, int]:
+        return self.value_counts("category")
+    
+    def complexity_counts(self) -> Dict[str, int]:
+        return self.value_counts("complexity")
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            getattr(self, codes_name).itemsize * len(self)
+            for _, codes_name in self._COLUMNS.values()
+        )
+
+class _CellTables:
+    
+    def __init__(self, generator: SimpleQuestionGenerator, cells: List[QuestionCell], categories: List[str]):
+        self._generator = generator
+        self.categories = list(categories)
+        self.personas = list(generator.user_personas)
+        self.questions = list(generator._index.question_pool)
+        self.complexities = []
+        self.subcategories = []
+        self._fallback_codes = {}
+        
+        category_codes = {category: code for code, category in enumerate(self.categories)}
+        persona_codes = {persona: code for code, persona in enumerate(self.personas)}
+        complexity_codes = {}
+        subcategory_codes = {}
+        category_subcategories = {}
+        for category in self.categories:
+            codes = []
+            for subcategory in generator.categories[category]["subcategories"]:
+                if subcategory not in subcategory_codes:
+                    subcategory_codes[subcategory] = len(self.subcategories)
+                    self.subcategories.append(subcategory)
+                codes.append(subcategory_codes[subcategory])
+            category_subcategories[category] = codes
+        
+        self.subcategory_table = []
+        self.subcategory_probabilities = []
+        self.subcategory_aliases = []
+        category_offsets = {}
+        for category, codes in category_subcategories.items():
+            category_offsets[category] = len(self.subcategory_table)
+            self.subcategory_table.extend(codes)
+            alias = generator._index.subcategory_aliases[category]
+            self.subcategory_probabilities.extend(alias.probabilities)
+            self.subcategory_aliases.extend(alias.aliases)
+        
+        self.flat_starts = []
+        self.flat_probabilities = []
+        self.flat_aliases = []
+        self.flat_totals = []
+        self.flat_sizes = []
+        self._slot_templates = generator._index.slot_templates
+        self._slot_codes = {}
+        self._question_codes = None
+        slice_offsets = {}
+        self.cell_categories = []
+        self.cell_complexities = []
+        self.cell_personas = []
+        self.cell_subcategory_offsets = []
+        self.cell_subcategory_counts = []
+        self.cell_template_offsets = []
+        self.cell_template_counts = []
+        for cell in cells:
+            if cell.complexity not in complexity_codes:
+                complexity_codes[cell.complexity] = len(self.complexities)
+                self.complexities.append(cell.complexity)
+            self.cell_categories.append(category_codes[cell.category])
+            self.cell_complexities.append(complexity_codes[cell.complexity])
+            self.cell_personas.append(persona_codes[cell.user_persona])
+            self.cell_subcategory_offsets.append(category_offsets[cell.category])
+            self.cell_subcategory_counts.append(len(category_subcategories[cell.category]))
+            
+            template_slice = generator._index.template_slices.get(cell.category, {}).get(cell.complexity)
+            if not template_slice:
+                self.cell_template_offsets.append(0)
+                self.cell_template_counts.append(0)
+                continue
+            key = (cell.category, cell.complexity)
+            if key not in slice_offsets:
+                slice_offsets[key] = len(self.flat_starts)
+                self.flat_starts.extend(template_slice.starts)
+                self.flat_probabilities.extend(template_slice.alias.probabilities)
+                self.flat_aliases.extend(template_slice.alias.aliases)
+                self.flat_totals.extend(count * size for count, size in zip(template_slice.counts, template_slice.sizes))
+                self.flat_sizes.extend(template_slice.sizes)
+            self.cell_template_offsets.append(slice_offsets[key])
+            self.cell_template_counts.append(len(template_slice.starts))
+        
+        self.flat_starts.append(0)
+        self.flat_probabilities.append(1.0)
+        self.flat_aliases.append(0)
+        self.flat_totals.append(1)
+        self.flat_sizes.append(1)
+        self.has_slots = any(size > 1 for size in self.flat_sizes)
+    
+    def slot_code(self, pool_index: int, combination: int) -> int:
+        key = (pool_index, combination)
+        code = self._slot_codes.get(key)
+        if code is None:
+            if self._question_codes is None:
+                self._question_codes = {question: code for code, question in enumerate(self.questions)}
+            question = self._slot_templates[pool_index].render(combination)
+            code = self._question_codes.get(question)
+            if code is None:
+                code = self._question_codes[question] = len(self.questions)
+                self.questions.append(question)
+            self._slot_codes[key] = code
+        return code
+    
+    def fallback_code(self, subcategory_code: int) -> int:
+        code = self._fallback_codes.get(subcategory_code)
+        if code is None:
+            code = self._fallback_codes[subcategory_code] = len(self.questions)
+            self.questions.append(self._generator._fallback_question(self.subcategories[subcategory_code]))
+            if self._question_codes is not None:
+                self._question_codes.setdefault(self.questions[-1], code)
+        return code
+
+def _code_array(vocabulary_size: int, codes, np=None) -> array:
+    typecode = "B" if vocabulary_size <= 0xFF else "H" if vocabulary_size <= 0xFFFF else "I"
+    if np is not None:
+        return array(typecode, np.asarray(codes, dtype=_NUMPY_DTYPES[typecode]).tobytes())
+    return array(typecode, codes)
+
+class _UniqueQuestionPool:
+    
+    def __init__(self, generator: SimpleQuestionGenerator, categories: List[str]):
+        self._generator = generator
+        self._index = generator._index
+        self._categories = categories
+        self._cells: Dict[Tuple[str, str], List[Any]] = {}
+        self._exhausted = set()
+        self.seen = set()
+    
+    def _category_questions(self, category: str) -> set:
+        questions = set()
+        pool = self._index.question_pool
+        slot_templates = self._index.slot_templates
+        for template_slice in self._index.template_slices.get(category, {}).values():
+            questions.update(pool[i] for i in template_slice.unique_indices if i not in slot_templates)
+        for subcategory in self._generator.categories[category]["subcategories"]:
+            questions.add(self._generator._fallback_question(subcategory))
+        return questions
+    
+    def check_capacity(self, num_questions: int):
+        available = set()
+        slot_space = 0
+        for category in self._categories:
+            available |= self._category_questions(category)
+            slot_space += self._category_slot_space(category)
+        available -= self.seen
+        # Slot combinations are counted, not rendered, so this bound is optimistic for them.
+        if num_questions > len(available) + slot_space:
+            raise ValueError(
+                f"Requested {num_questions} unique questions but only {len(available) + slot_space} "
+                f"distinct questions are available for {', '.join(self._categories)}"
+            )
+    
+    def _category_slot_space(self, category: str) -> int:
+        slot_templates = self._index.slot_templates
+        return sum(
+            slot_templates[i].size
+            for template_slice in self._index.template_slices.get(category, {}).values()
+            for i in template_slice.unique_indices if i in slot_templates
+        )
+    
+    def available_category(self, category: str) -> str:
+        offset = self._categories.index(category)
+        for i in range(len(self._categories)):
+            candidate = self._categories[(offset + i) % len(self._categories)]
+            if candidate not in self._exhausted:
+                return candidate
+        raise ValueError("All unique questions for the requested categories have been used")
+    
+    def take_any(self, category: str, complexity: str, subcategory_draw: float,
+                 draw: float) -> Tuple[str, str, str, str]:
+        while True:
+            category = self.available_category(category)
+            subcategories = self._generator.categories[category]["subcategories"]
+            subcategory = subcategories[self._index.subcategory_aliases[category].index(subcategory_draw)]
+            try:
+                question, complexity_taken, subcategory = self.take(category, complexity, subcategory, draw)
+            except _UniqueCategoryExhausted:
+                continue
+            return question, category, complexity_taken, subcategory
+    
+    def take(self, category: str, complexity: str, subcategory: str, draw: float) -> Tuple[str, str, str]:
+        question = self._take_template(category, complexity, draw)
+        if question is not None:
+            return question, complexity, subcategory
+        
+        for other in self._generator.categories[category]["complexity_distribution"]:
+            question = self._take_template(category, other, draw)
+            if question is not None:
+                return question, other, subcategory
+        
+        subcategories = self._generator.categories[category]["subcategories"]
+        for candidate in (subcategory,) + tuple(s for s in subcategories if s != subcategory):
+            question = self._generator._fallback_question(candidate)
+            if question not in self.seen:
+                self.seen.add(question)
+                return question, complexity, candidate
+        
+        self._exhausted.add(category)
+        raise _UniqueCategoryExhausted(category)
+    
+    def _take_template(self, category: str, complexity: str, draw: float) -> Optional[str]:
+        template_slice = self._index.template_slices.get(category, {}).get(complexity)
+        if not template_slice:
+            return None
+        
+        slot_templates = self._index.slot_templates
+        cell = self._cells.get((category, complexity))
+        if cell is None:
+            # Each distinct entry spans as many indices as it has slot combinations.
+            bounds = []
+            total = 0
+            for i in template_slice.unique_indices:
+                total += slot_templates[i].size if i in slot_templates else 1
+                bounds.append(total)
+            cell = self._cells[(category, complexity)] = [total, {}, bounds]
+        
+        pool = self._index.question_pool
+        while cell[0]:
+            remaining, swaps, bounds = cell
+            picked = int(draw * remaining)
+            last = remaining - 1
+            index = swaps.get(picked, picked)
+            swaps[picked] = swaps.pop(last, last)
+            cell[0] = last
+            
+            entry = bisect_right(bounds, index)
+            pool_index = template_slice.unique_indices[entry]
+            if pool_index in slot_templates:
+                question = slot_templates[pool_index].render(index - (bounds[entry - 1] if entry else 0))
+            else:
+                question = pool[pool_index]
+            if question not in self.seen:
+                self.seen.add(question)
+                return question
+        return None
+
+class _UniqueCategoryExhausted(ValueError):
+    
+    def __init__(self, category: str):
+        super().__init__(f"All unique questions for '{category}' have been used")
+        self.category = category
+
+def get_template_index(state: str) -> TemplateIndex:
+    index = _TEMPLATE_INDEXES.get(state)
+    if index is not None:
+        return index
+    
+    with _TEMPLATE_INDEX_LOCK:
+        index = _TEMPLATE_INDEXES.get(state)
+        if index is None:
+            index = _build_template_index(state)
+            _TEMPLATE_INDEXES[state] = index
+    return index
+
+def load_template_pack(state: str) -> Dict[str, Any]:
+    with open(_template_pack_path(state), 'rb') as f:
+        return json.loads(f.read())
+
+def get_state_registry() -> Dict[str, Any]:
+    global _STATE_REGISTRY
+    if _STATE_REGISTRY is None:
+        with open(os.path.join(TEMPLATE_PACK_DIR, "registry.json"), 'rb') as f:
+            _STATE_REGISTRY = json.loads(f.read())
+    return _STATE_REGISTRY
+
+def get_state_name(state: str) -> str:
+    entry = get_state_registry()["states"].get(state)
+    return entry["name"] if entry else get_template_index(state).state_name
+
+def _template_pack_path(state: str) -> str:
+    registry = get_state_registry()
+    entry = registry["states"].get(state)
+    if entry is not None:
+        return os.path.join(TEMPLATE_PACK_DIR, entry["pack"])
+    if state.isalnum():
+        path = os.path.join(TEMPLATE_PACK_DIR, f"{state}.json")
+        if os.path.exists(path):
+            return path
+    return os.path.join(TEMPLATE_PACK_DIR, registry["states"][registry["default_state"]]["pack"])
+
+def _template_cache_dir() -> Optional[str]:
+    directory = os.environ.get("QUESTION_GENERATOR_CACHE_DIR")
+    if directory is None:
+        directory = os.path.join(os.path.expanduser("~"), ".cache", "question_generator")
+    return directory or None
+
+def _load_compiled_pack(state: str) -> Dict[str, Any]:
+    path = _template_pack_path(state)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    
+    cache_dir = _template_cache_dir()
+    if cache_dir is None:
+        return _compile_template_pack(json.loads(raw))
+    
+    # The cache modules are only imported once a cache directory is actually used.
+    import hashlib
+    import pickle
+    
+    pack_name = os.path.splitext(os.path.basename(path))[0]
+    # The built-in paraphrases are compiled into every pack, so they are part of the digest.
+    digest = hashlib.sha256(raw + json.dumps(DEFAULT_PARAPHRASES, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+    cache_path = os.path.join(cache_dir, f"{pack_name}-v{TEMPLATE_CACHE_VERSION}-{digest}.pickle")
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        pass
+    
+    compiled = _compile_template_pack(json.loads(raw))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return compiled
+
+def _compile_template_pack(pack: Dict[str, Any]) -> Dict[str, Any]:
+    if pack.get("format") != TEMPLATE_PACK_FORMAT:
+        raise ValueError(f"Unsupported template pack format: {pack.get('format')}")
+    
+    categories = {}
+    subcategory_aliases = {}
+    for name, info in pack["categories"].items():
+        subcategories = tuple(info["subcategories"])
+        subcategory_weights = info.get("subcategory_weights", {})
+        unknown = set(subcategory_weights) - set(subcategories)
+        if unknown:
+            raise ValueError(f"Weights for unknown subcategories of {name}: {', '.join(sorted(unknown))}")
+        _check_weights(info["complexity_distribution"].values(), f"{name} complexity distribution")
+        categories[name] = {
+            "subcategories": subcategories,
+            "complexity_distribution": dict(info["complexity_distribution"])
+        }
+        subcategory_aliases[name] = AliasTable(
+            [subcategory_weights.get(subcategory, 1.0) for subcategory in subcategories], f"{name} subcategory weights"
         )
+    
+    # A template is either a question string or {"question": ..., "weight": ...}.
+    templates = {}
+    template_weights = {}
+    for category, by_complexity in pack["templates"].items():
+        templates[category] = {}
+        template_weights[category] = {}
+        for complexity, entries in by_complexity.items():
+            entries = [entry if isinstance(entry, dict) else {"question": entry} for entry in entries]
+            templates[category][complexity] = tuple(entry["question"] for entry in entries)
+            template_weights[category][complexity] = [entry.get("weight", 1.0) for entry in entries]
+    
+    paraphrases = ParaphraseRules({**DEFAULT_PARAPHRASES, **pack.get("paraphrases", {})})
+    slots = {name: tuple(values) for name, values in pack.get("slots", {}).items()}
+    slots.setdefault("state_name", (pack["state_name"],))
+    for name, values in slots.items():
+        if not values:
+            raise ValueError(f"Slot '{name}' has no values")
+    
+    question_pool = []
+    template_slices = {}
+    slot_templates = {}
+    for category, by_complexity in templates.items():
+        template_slices[category] = {}
+        for complexity, questions in by_complexity.items():
+            if not questions:
+                continue
+            starts = []
+            counts = []
+            sizes = []
+            first_indices = {}
+            for base_question in questions:
+                variations = paraphrases.variants(base_question)
+                starts.append(len(question_pool))
+                counts.append(len(variations))
+                size = 1
+                for variation in variations:
+                    first_indices.setdefault(variation, len(question_pool))
+                    if "{" in variation or "}" in variation:
+                        template = SlotTemplate(variation, slots)
+                        size = template.size
+                        if size == 1:
+                            # Single-valued slots such as {state_name} are filled in once, here.
+                            variation = template.render(0)
+                        else:
+                            slot_templates[len(question_pool)] = template
+                    question_pool.append(variation)
+                sizes.append(size)
+            template_slices[category][complexity] = (
+                tuple(starts), tuple(counts), tuple(first_indices.values()), tuple(sizes),
+                AliasTable(template_weights[category][complexity], f"{category}/{complexity} template weights")
+            )
+    
+    subcategory_labels = {
+        subcategory: subcategory.replace('_', ' ')
+        for info in categories.values()
+        for subcategory in info["subcategories"]
+    }
+    
+    return {
+        "state_name": pack["state_name"],
+        "categories": categories,
+        "templates": templates,
+        "subcategory_labels": subcategory_labels,
+        "question_pool": tuple(question_pool),
+        "template_slices": template_slices,
+        "slot_templates": slot_templates,
+        "paraphrases": paraphrases,
+        "subcategory_aliases": subcategory_aliases
+    }
+
+def _build_template_index(state: str) -> TemplateIndex:
+    compiled = _load_compiled_pack(state)
+    
+    return TemplateIndex(
+        state=state,
+        state_name=compiled["state_name"],
+        # Every level is read-only: the index is shared by all generators for the state.
+        categories=MappingProxyType({
+            name: MappingProxyType({
+                **info, "complexity_distribution": MappingProxyType(info["complexity_distribution"])
+            })
+            for name, info in compiled["categories"].items()
+        }),
+        templates=MappingProxyType({
+            category: MappingProxyType(by_complexity) for category, by_complexity in compiled["templates"].items()
+        }),
+        subcategory_labels=MappingProxyType(compiled["subcategory_labels"]),
+        question_pool=compiled["question_pool"],
+        template_slices=MappingProxyType({
+            category: MappingProxyType({
+                complexity: TemplateSlice(*columns) for complexity, columns in slices.items()
+            })
+            for category, slices in compiled["template_slices"].items()
+        }),
+        slot_templates=MappingProxyType(compiled["slot_templates"]),
+        paraphrases=compiled["paraphrases"],
+        subcategory_aliases=MappingProxyType(compiled["subcategory_aliases"])
+    )
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional continuations make each site the longest phrase that matches there.
+        return f"(?:{body})?" if "" in node else body
+    
+    return build(trie)
+
+def _splice(text: str, spans: List[Tuple[int, int]], replacement: str) -> str:
+    parts = []
+    last = 0
+    for start, end in spans:
+        parts.append(text[last:start])
+        parts.append(replacement)
+        last = end
+    parts.append(text[last:])
+    return "".join(parts)
+
+def __getattr__(name: str):
+    if name == "STATE_NAMES":
+        return {state: entry["name"] for state, entry in get_state_registry()["states"].items()}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def main():
     generator = SimpleQuestionGenerator()
@@ -961,19 +1787,16 @@ def main():
     print("Generating test questions for evaluation...")
     
     test_sets = {
-        "comprehensive": generator.generate_questions(50),
-        "basic_services": generator.generate_focused_test_set("basic_services", 30),
-        "complex_scenarios": generator.generate_focused_test_set("complex_scenarios", 20)
+        "comprehensive": generator.generate_batch(50),
+        "basic_services": generator.generate_focused_batch("basic_services", 30),
+        "complex_scenarios": generator.generate_focused_batch("complex_scenarios", 20)
     }
     
     for test_name, questions in test_sets.items():
         filename = generator.save_questions(questions, f"simple_{test_name}_questions.json")
         
-        category_counts = {}
-        complexity_counts = {}
-        for q in questions:
-            category_counts[q.category] = category_counts.get(q.category, 0) + 1
-            complexity_counts[q.complexity] = complexity_counts.get(q.complexity, 0) + 1
+        category_counts = questions.category_counts()
+        complexity_counts = questions.complexity_counts()
         
         print(f"\n{test_name.upper()} TEST SET:")
         print(f"   File: {filename}")